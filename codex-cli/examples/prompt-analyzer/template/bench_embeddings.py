@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""Throughput benchmark for ``embed_texts`` against a local stub server.
+
+The stub speaks just enough of the ``/v1/embeddings`` API for the OpenAI
+client, adds a fixed per-request latency and, with ``--rps``, answers
+``429`` + ``Retry-After`` once a requests-per-second budget is exceeded –
+so the adaptive window and retry path are exercised too.
+
+    python bench_embeddings.py --texts 20000 --latency 0.2 --rps 20
+
+``sequential`` sends the same token-packed batches one at a time, as the
+old loop did; ``concurrent`` keeps ``--concurrency`` requests in flight.
+"""
+
+from __future__ import annotations
+
+import argparse
+import base64
+import json
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from cluster_prompts import embed_texts
+
+
+def make_handler(latency: float, rps: float | None, dim: int):
+    lock = threading.Lock()
+    window = {"start": time.monotonic(), "count": 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args) -> None:  # keep the benchmark output clean
+            pass
+
+        def _throttled(self) -> bool:
+            if rps is None:
+                return False
+            with lock:
+                now = time.monotonic()
+                if now - window["start"] >= 1.0:
+                    window["start"], window["count"] = now, 0
+                window["count"] += 1
+                return window["count"] > rps
+
+        def do_POST(self) -> None:
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            time.sleep(latency)
+            if self._throttled():
+                payload = b'{"error": {"message": "Rate limit reached", "type": "requests"}}'
+                self.send_response(429)
+                self.send_header("retry-after-ms", "250")
+            else:
+                inputs = body["input"]
+                data = []
+                for i, text in enumerate(inputs):
+                    vector = [float((len(text) + i + j) % 7) for j in range(dim)]
+                    if body.get("encoding_format") == "base64":
+                        embedding = base64.b64encode(struct.pack(f"<{dim}f", *vector)).decode()
+                    else:
+                        embedding = vector
+                    data.append({"object": "embedding", "index": i, "embedding": embedding})
+                tokens = sum(len(t) // 4 + 1 for t in inputs)
+                payload = json.dumps(
+                    {
+                        "object": "list",
+                        "data": data,
+                        "model": body["model"],
+                        "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+                    }
+                ).encode()
+                self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+    return Handler
+
+
+def run(client, texts: list[str], label: str, **kwargs) -> None:
+    start = time.perf_counter()
+    vectors = embed_texts(texts, "stub-embedding", client=client, **kwargs)
+    elapsed = time.perf_counter() - start
+    assert len(vectors) == len(texts) and all(v is not None for v in vectors)
+    print(f"{label:<11} {len(texts) / elapsed:10,.0f} texts/s  ({elapsed:.2f}s)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--texts", type=int, default=20_000)
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds per request.")
+    parser.add_argument("--rps", type=float, default=None, help="Throttle above this many requests/s.")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--batch-tokens", type=int, default=8_000)
+    parser.add_argument("--dim", type=int, default=32)
+    args = parser.parse_args()
+
+    import openai
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(args.latency, args.rps, args.dim))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = openai.OpenAI(
+        api_key="stub", base_url=f"http://127.0.0.1:{server.server_address[1]}/v1", max_retries=0
+    )
+    # Mixed prompt lengths, like a real corpus.
+    texts = [f"prompt {i} " + "word " * (i % 200) for i in range(args.texts)]
+    try:
+        run(client, texts, "sequential", concurrency=1, max_batch_tokens=args.batch_tokens)
+        run(client, texts, "concurrent", concurrency=args.concurrency, max_batch_tokens=args.batch_tokens)
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
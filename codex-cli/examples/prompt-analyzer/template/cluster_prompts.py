@@ -6,7 +6,7 @@ The script performs the following steps:
 1.  Read a CSV file that must contain a column named ``prompt``. If an
     ``act`` column is present it is used purely for reporting purposes.
 2.  Create embeddings via the OpenAI API (``text-embedding-3-small`` by
-    default).  The user can optionally provide a JSON cache path so the
+    default).  The user can optionally provide a cache directory so the
     expensive embedding step is only executed for new / unseen texts.
 3.  Cluster the resulting vectors either with K‑Means (automatically picking
     *k* through the silhouette score) or with DBSCAN.  Outliers are flagged
@@ -24,14 +24,25 @@ options – run ``python cluster_prompts.py --help`` for details.
 from __future__ import annotations
 
 import argparse
+import contextlib
+import hashlib
 import json
+import random
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, Sequence
+from typing import Any, Iterator, Sequence
 
 import numpy as np
 import pandas as pd
 
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, one writer at a time
+    fcntl = None  # type: ignore[assignment]
+
 # External, heavy‑weight libraries are imported lazily so that users running the
 # ``--help`` command do not pay the startup cost.
 
@@ -50,13 +61,31 @@ def parse_cli() -> argparse.Namespace:  # noqa: D401
         "--cache",
         type=Path,
         default=None,
-        help="Optional JSON cache for embeddings (will be created if it does not exist).",
+        help="Optional embedding cache directory (will be created if it does not exist).",
+    )
+    parser.add_argument(
+        "--migrate-json-cache",
+        type=Path,
+        default=None,
+        help="Convert an old JSON embedding cache into the --cache directory and exit.",
     )
     parser.add_argument(
         "--embedding-model",
         default="text-embedding-3-small",
         help="OpenAI embedding model to use.",
     )
+    parser.add_argument(
+        "--embed-concurrency",
+        type=int,
+        default=8,
+        help="Maximum number of embedding requests in flight (narrowed automatically on throttling).",
+    )
+    parser.add_argument(
+        "--embed-batch-tokens",
+        type=int,
+        default=MAX_BATCH_TOKENS,
+        help="Token budget per embedding request; prompts are packed up to this size.",
+    )
     parser.add_argument(
         "--chat-model",
         default="gpt-4o-mini",
@@ -113,65 +142,398 @@ def _lazy_import_openai():  # noqa: D401
         ) from exc
 
 
-def embed_texts(texts: Sequence[str], model: str, batch_size: int = 100) -> list[list[float]]:
-    """Embed *texts* with OpenAI and return a list of vectors.
+# Per-request limits of the embeddings endpoint.
+MAX_BATCH_ITEMS = 2048
+MAX_BATCH_TOKENS = 100_000
 
-    Uses batching for efficiency but remains on the safe side regarding current
-    OpenAI rate limits (can be adjusted by changing *batch_size*).
+# HTTP statuses worth retrying: throttling, timeouts and server errors.
+_RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+def _token_counter():
+    """Return a ``text -> token count`` function (tiktoken if available)."""
+
+    try:
+        import tiktoken  # type: ignore
+
+        encoding = tiktoken.get_encoding("cl100k_base")
+        return lambda text: len(encoding.encode(text, disallowed_special=()))
+    except Exception:  # pragma: no cover – tiktoken is optional.
+        # ~4 characters per token for English text.
+        return lambda text: len(text) // 4 + 1
+
+
+def pack_batches(
+    texts: Sequence[str],
+    *,
+    max_tokens: int = MAX_BATCH_TOKENS,
+    max_items: int = MAX_BATCH_ITEMS,
+) -> list[list[int]]:
+    """Group the indices of *texts* into batches bounded by token count.
+
+    Consecutive texts are packed greedily until adding the next one would
+    exceed *max_tokens* or *max_items*, so short prompts share a request
+    while long ones do not overflow it.  A single text larger than
+    *max_tokens* gets a batch of its own.
     """
 
-    openai = _lazy_import_openai()
-    client = openai.OpenAI()
+    count_tokens = _token_counter()
+    batches: list[list[int]] = []
+    current: list[int] = []
+    current_tokens = 0
+    for i, text in enumerate(texts):
+        tokens = count_tokens(text)
+        if current and (current_tokens + tokens > max_tokens or len(current) >= max_items):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(i)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+class AdaptiveWindow:
+    """Bounded in‑flight window that shrinks on throttling (AIMD).
+
+    At most ``limit`` requests run at once.  A throttled request halves the
+    limit and pauses new requests for the server's ``Retry-After`` (or the
+    backoff delay); every success grows it by one again, up to *maximum*.
+    """
 
-    embeddings: list[list[float]] = []
+    def __init__(self, maximum: int) -> None:
+        self.maximum = max(1, maximum)
+        self.limit = self.maximum
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self._cond = threading.Condition()
+
+    def acquire(self) -> None:
+        with self._cond:
+            while True:
+                wait = self.paused_until - time.monotonic()
+                if wait <= 0 and self.in_flight < self.limit:
+                    self.in_flight += 1
+                    return
+                self._cond.wait(timeout=wait if wait > 0 else None)
+
+    def release(self, *, throttled: bool = False, pause: float = 0.0) -> None:
+        with self._cond:
+            self.in_flight -= 1
+            if throttled:
+                self.limit = max(1, self.limit // 2)
+                self.paused_until = max(self.paused_until, time.monotonic() + pause)
+            elif self.limit < self.maximum:
+                self.limit += 1
+            self._cond.notify_all()
+
+
+def _retry_after(exc: Exception) -> float | None:
+    """Seconds the server asked us to wait, if it said so."""
+
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    for name, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        value = headers.get(name)
+        if value is not None:
+            try:
+                return float(value) * scale
+            except ValueError:
+                pass
+    return None
+
+
+def _is_retryable(exc: Exception) -> bool:
+    status = getattr(exc, "status_code", None)
+    if status is not None:
+        return status in _RETRYABLE_STATUS or status >= 500
+    # Connection resets and timeouts carry no status code.
+    return type(exc).__name__ in {"APIConnectionError", "APITimeoutError"}
+
+
+def embed_texts(
+    texts: Sequence[str],
+    model: str,
+    *,
+    concurrency: int = 8,
+    max_batch_tokens: int = MAX_BATCH_TOKENS,
+    max_retries: int = 6,
+    client: Any = None,
+) -> list[list[float]]:
+    """Embed *texts* with OpenAI and return the vectors in input order.
+
+    Texts are packed into batches by token count (see :func:`pack_batches`)
+    and up to *concurrency* batches are in flight at once.  Throttled or
+    failed requests are retried with exponential backoff and jitter,
+    honouring ``Retry-After``, while :class:`AdaptiveWindow` narrows the
+    window so the run settles just under the account's rate limit.  The
+    first batch that fails for good cancels the batches not yet sent.
+    """
 
-    for batch_start in range(0, len(texts), batch_size):
-        batch = texts[batch_start : batch_start + batch_size]
+    if client is None:
+        openai = _lazy_import_openai()
+        # Retries are handled here so throttling also narrows the window.
+        client = openai.OpenAI(max_retries=0)
+
+    batches = pack_batches(texts, max_tokens=max_batch_tokens)
+    window = AdaptiveWindow(concurrency)
+    embeddings: list[list[float] | None] = [None] * len(texts)
+    # Set once a batch fails for good, so queued and waiting batches stop
+    # instead of making further (billed) requests.
+    stop = threading.Event()
+
+    def run(batch: list[int]) -> None:
+        for attempt in range(max_retries + 1):
+            if stop.is_set():
+                return
+            window.acquire()
+            if stop.is_set():
+                window.release()
+                return
+            try:
+                response = client.embeddings.create(input=[texts[i] for i in batch], model=model)
+            except Exception as exc:
+                if attempt == max_retries or not _is_retryable(exc):
+                    stop.set()
+                    window.release()
+                    raise
+                delay = _retry_after(exc)
+                if delay is None:
+                    delay = random.uniform(0, min(60.0, 0.5 * 2**attempt))
+                throttled = getattr(exc, "status_code", None) == 429
+                window.release(throttled=throttled, pause=delay if throttled else 0.0)
+                if not throttled:
+                    stop.wait(delay)
+                continue
+            window.release()
+            # ``index`` refers to the position within this request's input.
+            for data in response.data:
+                embeddings[batch[data.index]] = data.embedding
+            return
+
+    pool = ThreadPoolExecutor(max_workers=max(1, concurrency))
+    try:
+        # ``result()`` re‑raises the first failure after its retries ran out.
+        for future in [pool.submit(run, batch) for batch in batches]:
+            future.result()
+    except BaseException:
+        stop.set()
+        pool.shutdown(wait=True, cancel_futures=True)
+        raise
+    pool.shutdown()
 
-        response = client.embeddings.create(input=batch, model=model)
-        # The API returns the vectors in the same order as the input list.
-        embeddings.extend(data.embedding for data in response.data)
+    return embeddings  # type: ignore[return-value]
 
-    return embeddings
 
+class EmbeddingCacheError(ValueError):
+    """The embedding cache directory is unusable (wrong layout, version or size)."""
 
-def load_or_create_embeddings(
-    prompts: pd.Series, *, cache_path: Path | None, model: str
-) -> pd.DataFrame:
-    """Return a *DataFrame* with one row per prompt and the embedding columns.
 
-    * If *cache_path* is provided and exists, known embeddings are loaded from
-      the JSON cache so they don't have to be re‑generated.
-    * Missing embeddings are requested from the OpenAI API and subsequently
-      appended to the cache.
-    * The returned DataFrame has the same index as *prompts*.
+class EmbeddingCache:
+    """Append‑only binary embedding cache stored in a directory.
+
+    * ``vectors.f32`` – row‑major float32 matrix, one row per embedding,
+      memory‑mapped on load so nothing is parsed or copied up front.
+    * ``keys.bin`` – 32‑byte ``sha256(model, text)`` per row, in row order;
+      loading it yields the key → row index.
+    * ``meta.json`` – format version and vector dimension.
+
+    New embeddings are appended to both files (vectors first), so an
+    interrupted run loses at most the rows whose key was not written; those
+    are trimmed on the next load.  Loading and appending hold an exclusive
+    ``flock`` on ``lock`` in the directory, and an append first picks up rows
+    other processes added, so several runs can share one ``--cache``.
+    (Without ``fcntl``, e.g. on Windows, only one run may use it at a time.)
     """
 
-    cache: dict[str, list[float]] = {}
-    if cache_path and cache_path.exists():
+    VERSION = 1
+    KEY_SIZE = 32
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = Path(directory)
+        if self.directory.is_file():
+            raise EmbeddingCacheError(
+                f"{self.directory} is a file. The embedding cache is now a directory; convert an old "
+                "JSON cache with --migrate-json-cache."
+            )
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.vectors_path = self.directory / "vectors.f32"
+        self.keys_path = self.directory / "keys.bin"
+        self.meta_path = self.directory / "meta.json"
+        self.lock_path = self.directory / "lock"
+        self.dim: int | None = None
+        self.index: dict[bytes, int] = {}
+        self.row_count = 0
+        self._matrix: np.ndarray | None = None
+        with self._locked():
+            self._sync()
+
+    @staticmethod
+    def key(model: str, text: str) -> bytes:
+        return hashlib.sha256(model.encode() + b"\0" + text.encode()).digest()
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    @contextlib.contextmanager
+    def _locked(self) -> Iterator[None]:
+        with self.lock_path.open("ab") as fh:
+            if fcntl is not None:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+            yield  # closing the file releases the lock
+
+    def _read_meta(self) -> None:
+        if not self.meta_path.exists():
+            return
         try:
-            cache = json.loads(cache_path.read_text())
-        except json.JSONDecodeError:  # pragma: no cover – unlikely.
-            print("⚠️  Cache file exists but is not valid JSON – ignoring.", file=sys.stderr)
+            meta = json.loads(self.meta_path.read_text())
+            version, dim = meta.get("version"), int(meta["dim"])
+        except (ValueError, KeyError, TypeError, AttributeError):
+            raise EmbeddingCacheError(f"Unreadable embedding cache metadata in {self.meta_path}.") from None
+        if version != self.VERSION:
+            raise EmbeddingCacheError(f"Unsupported embedding cache version in {self.meta_path}.")
+        self.dim = dim
+
+    def _sync(self) -> None:
+        """Index rows written since the last sync; the caller holds the lock."""
+
+        if self.dim is None:
+            self._read_meta()
+            if self.dim is None:
+                return
+        key_rows = (self.keys_path.stat().st_size if self.keys_path.exists() else 0) // self.KEY_SIZE
+        vector_rows = (self.vectors_path.stat().st_size if self.vectors_path.exists() else 0) // (4 * self.dim)
+        rows = min(key_rows, vector_rows)
+        # Trim a partially written tail left by an interrupted append.
+        for path, size in ((self.keys_path, rows * self.KEY_SIZE), (self.vectors_path, rows * 4 * self.dim)):
+            if path.exists() and path.stat().st_size != size:
+                with path.open("r+b") as fh:
+                    fh.truncate(size)
+        if rows <= self.row_count:
+            return
+        with self.keys_path.open("rb") as fh:
+            fh.seek(self.row_count * self.KEY_SIZE)
+            keys = fh.read((rows - self.row_count) * self.KEY_SIZE)
+        for i in range(rows - self.row_count):
+            self.index.setdefault(keys[i * self.KEY_SIZE : (i + 1) * self.KEY_SIZE], self.row_count + i)
+        self.row_count = rows
+        self._matrix = None
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """All cached vectors as a read‑only ``(rows, dim)`` memory map."""
+
+        if self._matrix is None:
+            if not self.row_count:
+                return np.empty((0, self.dim or 0), dtype=np.float32)
+            self._matrix = np.memmap(
+                self.vectors_path, dtype="<f4", mode="r", shape=(self.row_count, self.dim)
+            )
+        return self._matrix
+
+    def lookup(self, model: str, texts: Sequence[str]) -> np.ndarray:
+        """Row of each text's cached embedding, ``-1`` where missing."""
+
+        index = self.index
+        return np.fromiter(
+            (index.get(self.key(model, t), -1) for t in texts), dtype=np.int64, count=len(texts)
+        )
+
+    def append(self, model: str, texts: Sequence[str], vectors: Any) -> np.ndarray:
+        """Append embeddings for *texts* and return their rows."""
+
+        mat = np.ascontiguousarray(vectors, dtype="<f4")
+        if mat.ndim != 2 or len(mat) != len(texts):
+            raise ValueError("expected one vector per text")
+        keys = [self.key(model, t) for t in texts]
+        with self._locked():
+            # Rows appended by another run since we loaded come first.
+            self._sync()
+            if self.dim is None:
+                self.dim = int(mat.shape[1])
+                self.meta_path.write_text(json.dumps({"version": self.VERSION, "dim": self.dim}))
+            elif mat.shape[1] != self.dim:
+                raise EmbeddingCacheError(
+                    f"Embedding dimension {mat.shape[1]} does not match the cache ({self.dim}); "
+                    "use a separate --cache directory per embedding size."
+                )
+            start = self.row_count
+            with self.vectors_path.open("ab") as fh:
+                fh.write(mat.tobytes())
+            with self.keys_path.open("ab") as fh:
+                fh.write(b"".join(keys))
+        for offset, key in enumerate(keys):
+            self.index.setdefault(key, start + offset)
+        self.row_count += len(keys)
+        self._matrix = None
+        return np.array([self.index[k] for k in keys], dtype=np.int64)
+
+    def rows(self, rows: np.ndarray) -> np.ndarray:
+        """Matrix for *rows*; a view of the memory map when they are contiguous."""
+
+        if len(rows) and rows[0] >= 0 and np.array_equal(rows, np.arange(rows[0], rows[0] + len(rows))):
+            return self.matrix[rows[0] : rows[0] + len(rows)]
+        return np.asarray(self.matrix[rows])
+
+
+def migrate_json_cache(json_path: Path, cache: EmbeddingCache, model: str, chunk: int = 10_000) -> int:
+    """Copy a legacy ``{text: vector}`` JSON cache into *cache*.
+
+    The JSON file does not record the model, so the vectors are filed under
+    *model*.  Texts already present are skipped.  Returns the rows added.
+    """
 
-    missing_mask = ~prompts.isin(cache)
+    legacy: dict[str, list[float]] = json.loads(Path(json_path).read_text())
+    texts = [t for t in legacy if cache.key(model, t) not in cache.index]
+    for start in range(0, len(texts), chunk):
+        part = texts[start : start + chunk]
+        cache.append(model, part, [legacy[t] for t in part])
+    return len(texts)
 
-    if missing_mask.any():
-        texts_to_embed = prompts[missing_mask].tolist()
-        print(f"Embedding {len(texts_to_embed)} new prompt(s)…", flush=True)
-        new_embeddings = embed_texts(texts_to_embed, model=model)
 
-        # Update cache (regardless of whether we persist it to disk later on).
-        cache.update(dict(zip(texts_to_embed, new_embeddings)))
+def load_or_create_embeddings(
+    prompts: pd.Series,
+    *,
+    cache_path: Path | None,
+    model: str,
+    concurrency: int = 8,
+    max_batch_tokens: int = MAX_BATCH_TOKENS,
+) -> pd.DataFrame:
+    """Return a *DataFrame* with one row per prompt and the embedding columns.
 
-        if cache_path:
-            cache_path.parent.mkdir(parents=True, exist_ok=True)
-            cache_path.write_text(json.dumps(cache))
+    * If *cache_path* is provided, known embeddings are read from the binary
+      :class:`EmbeddingCache` in that directory without parsing anything.
+    * Missing embeddings are requested from the OpenAI API and appended to
+      the cache.
+    * The returned DataFrame has the same index as *prompts*.
+    """
 
-    # Build a consistent embeddings matrix
-    vectors = prompts.map(cache.__getitem__).tolist()  # type: ignore[arg-type]
-    mat = np.array(vectors, dtype=np.float32)
-    return pd.DataFrame(mat, index=prompts.index)
+    texts = prompts.tolist()
+    cache = EmbeddingCache(cache_path) if cache_path else None
+    rows = cache.lookup(model, texts) if cache is not None else np.full(len(texts), -1, dtype=np.int64)
+
+    # Each distinct missing text is embedded once.
+    missing = list(dict.fromkeys(t for t, r in zip(texts, rows) if r < 0))
+    fresh: dict[str, int] = {}
+    new_matrix: np.ndarray | None = None
+    if missing:
+        print(f"Embedding {len(missing)} new prompt(s)…", flush=True)
+        new_matrix = np.asarray(
+            embed_texts(missing, model=model, concurrency=concurrency, max_batch_tokens=max_batch_tokens),
+            dtype=np.float32,
+        )
+        if cache is not None:
+            new_rows = cache.append(model, missing, new_matrix)
+            fresh = dict(zip(missing, new_rows.tolist()))
+        else:
+            fresh = {t: i for i, t in enumerate(missing)}
+
+    if cache is not None:
+        if missing:
+            rows = np.array([fresh[t] if r < 0 else r for t, r in zip(texts, rows)], dtype=np.int64)
+        mat = cache.rows(rows)
+    else:
+        mat = new_matrix[[fresh[t] for t in texts]] if new_matrix is not None else np.empty((0, 0), np.float32)
+    return pd.DataFrame(mat, index=prompts.index, copy=False)
 
 
 # ---------------------------------------------------------------------------
@@ -478,6 +840,17 @@ def create_plots(
 def main() -> None:  # noqa: D401
     args = parse_cli()
 
+    if args.migrate_json_cache:
+        if not args.cache:
+            raise SystemExit("--migrate-json-cache needs a target --cache directory.")
+        try:
+            cache = EmbeddingCache(args.cache)
+            added = migrate_json_cache(args.migrate_json_cache, cache, args.embedding_model)
+        except EmbeddingCacheError as exc:
+            raise SystemExit(str(exc)) from None
+        print(f"✅ Migrated {added} embedding(s) into {args.cache} ({len(cache)} cached).", flush=True)
+        return
+
     # Read CSV – require a 'prompt' column.
     df = pd.read_csv(args.csv)
     if "prompt" not in df.columns:
@@ -489,14 +862,22 @@ def main() -> None:  # noqa: D401
     # ---------------------------------------------------------------------
     # 1. Embeddings (may be cached)
     # ---------------------------------------------------------------------
-    embeddings_df = load_or_create_embeddings(
-        df["prompt"], cache_path=args.cache, model=args.embedding_model
-    )
+    try:
+        embeddings_df = load_or_create_embeddings(
+            df["prompt"],
+            cache_path=args.cache,
+            model=args.embedding_model,
+            concurrency=args.embed_concurrency,
+            max_batch_tokens=args.embed_batch_tokens,
+        )
+    except EmbeddingCacheError as exc:
+        raise SystemExit(str(exc)) from None
 
     # ---------------------------------------------------------------------
     # 2. Clustering
     # ---------------------------------------------------------------------
-    mat = embeddings_df.values.astype(np.float32)
+    # No copy when the embeddings are already float32 (e.g. straight from the cache).
+    mat = np.asarray(embeddings_df.values, dtype=np.float32)
 
     if args.cluster_method == "kmeans":
         labels = cluster_kmeans(mat, k_max=args.k_max)
@@ -0,0 +1,134 @@
+import json
+import threading
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("pandas")
+
+import cluster_prompts as cp  # noqa: E402
+
+
+def test_cache_appends_and_reloads(tmp_path):
+    cache = cp.EmbeddingCache(tmp_path)
+    rows = cache.append("m", ["a", "b"], [[1.0, 2.0], [3.0, 4.0]])
+    assert rows.tolist() == [0, 1]
+    assert cache.append("m", ["c"], [[5.0, 6.0]]).tolist() == [2]
+
+    reloaded = cp.EmbeddingCache(tmp_path)
+    assert len(reloaded) == 3 and reloaded.dim == 2
+    found = reloaded.lookup("m", ["c", "a", "missing"])
+    assert found.tolist() == [2, 0, -1]
+    assert reloaded.rows(np.array([0, 1])).tolist() == [[1.0, 2.0], [3.0, 4.0]]
+    assert reloaded.rows(np.array([2, 0])).tolist() == [[5.0, 6.0], [1.0, 2.0]]
+    # the model is part of the key
+    assert reloaded.lookup("other", ["a"]).tolist() == [-1]
+
+
+def test_cache_trims_a_torn_tail(tmp_path):
+    cache = cp.EmbeddingCache(tmp_path)
+    cache.append("m", ["a", "b"], [[1.0, 2.0], [3.0, 4.0]])
+    # an interrupted append: a vector written without its key, plus a stray byte
+    with open(tmp_path / "vectors.f32", "ab") as fh:
+        fh.write(np.array([9.0, 9.0], dtype="<f4").tobytes() + b"\0")
+    with open(tmp_path / "keys.bin", "ab") as fh:
+        fh.write(b"\1" * 5)
+
+    reloaded = cp.EmbeddingCache(tmp_path)
+    assert reloaded.row_count == 2
+    assert (tmp_path / "vectors.f32").stat().st_size == 2 * 2 * 4
+    assert (tmp_path / "keys.bin").stat().st_size == 2 * cp.EmbeddingCache.KEY_SIZE
+    assert reloaded.append("m", ["c"], [[5.0, 6.0]]).tolist() == [2]
+    assert reloaded.rows(np.array([2])).tolist() == [[5.0, 6.0]]
+
+
+def test_cache_rejects_other_dimensions_and_bad_layouts(tmp_path):
+    cache = cp.EmbeddingCache(tmp_path / "cache")
+    cache.append("m", ["a"], [[1.0, 2.0]])
+    with pytest.raises(cp.EmbeddingCacheError, match="dimension"):
+        cache.append("m", ["b"], [[1.0, 2.0, 3.0]])
+    (tmp_path / "cache" / "meta.json").write_text(json.dumps({"version": 99, "dim": 2}))
+    with pytest.raises(cp.EmbeddingCacheError, match="version"):
+        cp.EmbeddingCache(tmp_path / "cache")
+    (tmp_path / "old.json").write_text("{}")
+    with pytest.raises(cp.EmbeddingCacheError, match="is a file"):
+        cp.EmbeddingCache(tmp_path / "old.json")
+
+
+def test_cache_writers_sharing_a_directory_keep_keys_aligned(tmp_path):
+    first = cp.EmbeddingCache(tmp_path)
+    second = cp.EmbeddingCache(tmp_path)
+    first.append("m", ["a"], [[1.0, 1.0]])
+    # second loaded before that append; its rows must land after it
+    assert second.append("m", ["b"], [[2.0, 2.0]]).tolist() == [1]
+    assert second.lookup("m", ["a"]).tolist() == [0]
+
+    reloaded = cp.EmbeddingCache(tmp_path)
+    rows = reloaded.lookup("m", ["a", "b"])
+    assert reloaded.rows(rows).tolist() == [[1.0, 1.0], [2.0, 2.0]]
+
+
+def test_migrate_json_cache(tmp_path):
+    legacy = tmp_path / "embeddings.json"
+    legacy.write_text(json.dumps({"a": [1.0, 2.0], "b": [3.0, 4.0]}))
+    cache = cp.EmbeddingCache(tmp_path / "cache")
+    cache.append("m", ["a"], [[1.0, 2.0]])
+
+    assert cp.migrate_json_cache(legacy, cache, "m", chunk=1) == 1
+    assert cp.migrate_json_cache(legacy, cache, "m") == 0
+    reloaded = cp.EmbeddingCache(tmp_path / "cache")
+    rows = reloaded.lookup("m", ["a", "b"])
+    assert reloaded.rows(rows).tolist() == [[1.0, 2.0], [3.0, 4.0]]
+
+
+class _StatusError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = type("Response", (), {"headers": headers or {}})()
+
+
+class _FakeEmbeddings:
+    """One vector ``[n]`` per text ``"t<n>"``; later batches answer sooner."""
+
+    def __init__(self, errors=None):
+        self.errors = errors or {}
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def create(self, input, model):
+        import time
+        from types import SimpleNamespace
+
+        with self.lock:
+            self.calls.append(list(input))
+            error = self.errors.pop(input[0], None)
+        if error is not None:
+            raise error
+        time.sleep(0.05 / (1 + int(input[0][1:])))
+        data = [SimpleNamespace(index=i, embedding=[float(t[1:])]) for i, t in enumerate(input)]
+        return SimpleNamespace(data=data)
+
+
+def test_pack_batches_bounds_items_and_tokens():
+    assert cp.pack_batches(["a"] * 5, max_items=2) == [[0, 1], [2, 3], [4]]
+    assert cp.pack_batches(["word " * 50, "a", "b"], max_tokens=10) == [[0], [1, 2]]
+
+
+def test_embed_texts_keeps_order_and_retries_throttling():
+    texts = [f"t{i}" for i in range(8)]
+    embeddings = _FakeEmbeddings({"t2": _StatusError(429, {"retry-after-ms": "10"})})
+    client = type("Client", (), {"embeddings": embeddings})()
+    vectors = cp.embed_texts(texts, "m", client=client, concurrency=4, max_batch_tokens=1)
+    assert vectors == [[float(i)] for i in range(8)]
+    assert [call[0] for call in embeddings.calls].count("t2") == 2
+
+
+def test_embed_texts_stops_after_a_fatal_error():
+    texts = [f"t{i}" for i in range(40)]
+    embeddings = _FakeEmbeddings({"t0": _StatusError(400)})
+    client = type("Client", (), {"embeddings": embeddings})()
+    with pytest.raises(_StatusError):
+        cp.embed_texts(texts, "m", client=client, concurrency=2, max_batch_tokens=1)
+    # queued batches are cancelled instead of still being sent
+    assert len(embeddings.calls) < 10
@@ -1,12 +1,239 @@
 from __future__ import annotations
+import asyncio
+import threading
 import time
-from typing import Any, Callable, Dict, Iterable, List, Optional
+import weakref
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional
+
+from .cache import ResponseCache
+from .chunks import ChunkBatcher, StreamChunk, thread_timer
+from .context import ConversationContext
+from .ratelimit import RateLimiter, estimate_tokens, shared_limiter
+from .retry import RetryPolicy
+from .rollout import RolloutRecorder
+from .telemetry import RequestMetrics
 
 try:
     import openai
 except Exception:  # pragma: no cover - openai optional
     openai = None
 
+try:
+    import httpx
+except Exception:  # pragma: no cover - httpx ships with openai
+    httpx = None
+
+
+@dataclass(frozen=True)
+class PoolOptions:
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 30.0
+    http2: bool = False
+
+
+class ClientRegistry:
+    """Process-wide cache of OpenAI clients keyed by (api_key, base_url, provider).
+
+    Reusing one client keeps its connection pool, TLS sessions and keep-alive
+    sockets warm across turns.  Async clients are bound to the event loop that
+    created them, so they are cached per running loop.
+    """
+
+    def __init__(self, options: PoolOptions | None = None) -> None:
+        self.options = options or PoolOptions()
+        self._clients: Dict[tuple, Any] = {}
+        self._async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[tuple, Any]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._lock = threading.Lock()
+
+    def configure(self, **options: Any) -> None:
+        with self._lock:
+            self.options = PoolOptions(**{**self.options.__dict__, **options})
+            self._clients.clear()
+            self._async_clients.clear()
+
+    def _http_client(self, is_async: bool) -> Any:
+        factory = getattr(openai, "DefaultAsyncHttpxClient" if is_async else "DefaultHttpxClient", None)
+        if httpx is None or factory is None:
+            return None
+        opts = self.options
+        limits = httpx.Limits(
+            max_connections=opts.max_connections,
+            max_keepalive_connections=opts.max_keepalive_connections,
+            keepalive_expiry=opts.keepalive_expiry,
+        )
+        return factory(limits=limits, http2=opts.http2)
+
+    def _build(self, factory: Any, api_key: str | None, base_url: str | None, is_async: bool) -> Any:
+        # AgentLoop's RetryPolicy is the only retry layer: SDK retries would
+        # multiply its attempts and bypass the Retry-After cap and rate limiter
+        kwargs: Dict[str, Any] = {"api_key": api_key, "max_retries": 0}
+        if base_url:
+            kwargs["base_url"] = base_url
+        http_client = self._http_client(is_async)
+        if http_client is not None:
+            kwargs["http_client"] = http_client
+        return factory(**kwargs)
+
+    def get(self, api_key: str | None, base_url: str | None = None, provider: str | None = None) -> Any:
+        if openai is None:
+            raise RuntimeError("openai package required")
+        if not hasattr(openai, "OpenAI"):
+            return openai
+        key = (openai.OpenAI, api_key, base_url, provider)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = self._clients[key] = self._build(openai.OpenAI, api_key, base_url, False)
+            return client
+
+    def get_async(self, api_key: str | None, base_url: str | None = None, provider: str | None = None) -> Any:
+        if openai is None or not hasattr(openai, "AsyncOpenAI"):
+            raise RuntimeError("openai package required")
+        loop = asyncio.get_running_loop()
+        key = (openai.AsyncOpenAI, api_key, base_url, provider)
+        with self._lock:
+            clients = self._async_clients.setdefault(loop, {})
+            client = clients.get(key)
+            if client is None:
+                client = clients[key] = self._build(openai.AsyncOpenAI, api_key, base_url, True)
+            return client
+
+    def clear(self) -> None:
+        with self._lock:
+            self._clients.clear()
+            self._async_clients.clear()
+
+
+default_registry = ClientRegistry()
+
+
+def _chunk_content(chunk: Any) -> str | None:
+    if isinstance(chunk, dict):
+        choices = chunk.get("choices") or []
+        return choices[0].get("delta", {}).get("content") if choices else None
+    choices = getattr(chunk, "choices", None) or []
+    delta = getattr(choices[0], "delta", None) if choices else None
+    return getattr(delta, "content", None)
+
+
+def _replace_content(chunk: Any, content: str) -> Any:
+    if isinstance(chunk, dict):
+        first = dict(chunk["choices"][0])
+        first["delta"] = {**first.get("delta", {}), "content": content}
+        return {**chunk, "choices": [first, *chunk["choices"][1:]]}
+    chunk = chunk.model_copy(deep=True)
+    chunk.choices[0].delta.content = content
+    return chunk
+
+
+@dataclass
+class RetryStats:
+    attempts: int = 0
+    bytes_wasted: int = 0
+    time_lost: float = 0.0
+
+
+class _ResumeState:
+    """Tracks what a run already delivered so a retried stream does not repeat it.
+
+    ``dedupe`` re-issues the same request and drops the prefix that was already
+    delivered, after checking the regenerated text really starts with it.  If
+    it does not (normal when sampling), ``ResumeMismatch`` is raised, unless
+    *prefill* says the provider honours assistant prefill, in which case the
+    run switches to ``continue``.  ``continue`` sends the delivered text back
+    as a partial assistant message so the provider only generates the
+    remainder.  Chunks without text (role, finish_reason, tool calls) seen
+    while skipping are held until the prefix is confirmed.
+    """
+
+    def __init__(self, messages: List[Dict[str, str]], strategy: str, prefill: bool = False) -> None:
+        if strategy not in {"dedupe", "continue"}:
+            raise ValueError(f"Unknown resume strategy: {strategy}")
+        self.messages = messages
+        self.strategy = strategy
+        self.prefill = prefill
+        self.delivered: List[str] = []
+        self.delivered_len = 0
+        self.skip = 0
+        self.expected = ""
+        self.held: List[Any] = []
+        self.stats = RetryStats()
+        self.started = 0.0
+        self.chunks: List[Any] = []
+
+    def begin(self) -> List[Dict[str, str]]:
+        self.stats.attempts += 1
+        self.started = time.monotonic()
+        if self.strategy == "continue" and self.delivered:
+            self.skip = 0
+            return [*self.messages, {"role": "assistant", "content": "".join(self.delivered)}]
+        self.skip = self.delivered_len
+        self.expected = "".join(self.delivered) if self.skip else ""
+        self.held = []
+        return self.messages
+
+    def failed(self, delay: float) -> None:
+        self.stats.time_lost += time.monotonic() - self.started + delay
+
+    def feed(self, chunk: Any) -> List[Any]:
+        """Chunks to deliver for *chunk*; raises ``ResumeMismatch`` (or
+        ``_ResumeDiverged`` with *prefill*) if the regenerated stream does not
+        repeat what was already delivered."""
+        content = _chunk_content(chunk)
+        if self.skip:
+            if not content:
+                self.held.append(chunk)
+                return []
+            pos = self.delivered_len - self.skip
+            n = min(len(content), self.skip)
+            if content[:n] != self.expected[pos : pos + n]:
+                self._diverged()
+            self.stats.bytes_wasted += len(content[:n].encode())
+            self.skip -= n
+            if self.skip:
+                return []
+            content = content[n:]
+            chunk = _replace_content(chunk, content) if content else None
+        out, self.held = [*self.held, *([chunk] if chunk is not None else [])], []
+        if content:
+            self.delivered.append(content)
+            self.delivered_len += len(content)
+        return out
+
+    def end(self) -> List[Any]:
+        """Called when a stream finishes; returns any chunks still held."""
+        if self.skip:
+            # the new answer is shorter than what was already delivered
+            self._diverged()
+        out, self.held = self.held, []
+        return out
+
+    def _diverged(self) -> None:
+        if not self.prefill:
+            raise ResumeMismatch(self.delivered_len)
+        self.strategy = "continue"
+        raise _ResumeDiverged()
+
+
+class _ResumeDiverged(Exception):
+    """A ``dedupe`` retry produced different text than the delivered prefix."""
+
+
+class ResumeMismatch(RuntimeError):
+    """A retried stream did not repeat the text already delivered.
+
+    The reply so far cannot be completed without splicing two different
+    answers together; the caller has to discard it and start over.
+    """
+
+    def __init__(self, delivered: int) -> None:
+        super().__init__(f"retried response diverged from the {delivered} characters already delivered")
+        self.delivered = delivered
+
 
 class AgentLoop:
     def __init__(
@@ -17,33 +244,286 @@ class AgentLoop:
         on_item: Callable[[Dict[str, Any]], None] | None = None,
         on_loading: Callable[[bool], None] | None = None,
         max_retries: int = 3,
+        *,
+        base_url: str | None = None,
+        provider: str | None = None,
+        client: Any = None,
+        registry: ClientRegistry | None = None,
+        resume: str = "dedupe",
+        prefill: bool = False,
+        retry_policy: RetryPolicy | None = None,
+        rate_limiter: RateLimiter | None = None,
+        cache: ResponseCache | None = None,
+        compact: bool = False,
+        batch_chunks: int | None = None,
+        batch_bytes: int | None = None,
+        batch_interval: float | None = None,
+        on_metrics: Callable[[RequestMetrics], None] | None = None,
+        include_usage: bool = False,
+        recorder: RolloutRecorder | None = None,
     ) -> None:
         self.model = model
         self.api_key = api_key
         self.instructions = instructions
         self.on_item = on_item or (lambda item: None)
         self.on_loading = on_loading or (lambda b: None)
-        self.max_retries = max_retries
+        self.retry_policy = retry_policy or RetryPolicy(max_retries=max_retries)
+        self.max_retries = self.retry_policy.max_retries
+        self.rate_limiter = rate_limiter or shared_limiter
+        self.base_url = base_url
+        self.provider = provider
+        self.client = client
+        self.registry = registry or default_registry
+        self.resume = resume
+        self.prefill = prefill
+        self.retry_stats = RetryStats()
+        self.cache = cache
+        self.compact = compact
+        self.batch_chunks = batch_chunks
+        self.batch_bytes = batch_bytes
+        self.batch_interval = batch_interval
+        self.on_metrics = on_metrics
+        self.include_usage = include_usage
+        self.recorder = recorder
+        self.last_metrics: RequestMetrics | None = None
 
-    def run(self, messages: List[Dict[str, str]]) -> None:
-        if openai is None:
-            raise RuntimeError("openai package required")
-        client = openai.OpenAI(api_key=self.api_key) if hasattr(openai, "OpenAI") else openai
+    def _request_params(self) -> Dict[str, Any]:
+        # extra chat.completions.create arguments; part of the cache key
+        if self.include_usage:
+            return {"stream_options": {"include_usage": True}}
+        return {}
+
+    def _cache_key(self, messages: List[Dict[str, str]]) -> str | None:
+        if self.cache is None:
+            return None
+        return self.cache.key(self.model, self.instructions, messages, self._request_params())
+
+    def _store(self, key: str, chunks: List[Any]) -> None:
+        try:
+            self.cache.put(key, chunks)
+        except OSError:
+            pass  # a full or read-only cache must not fail the run
+
+    def _finish_metrics(self, metrics: RequestMetrics) -> None:
+        metrics.retries = max(0, self.retry_stats.attempts - 1) if not metrics.cached else 0
+        metrics.finish()
+        self.last_metrics = metrics
+        if self.on_metrics is not None:
+            self.on_metrics(metrics)
+
+    def stream(self, messages: List[Dict[str, str]] | ConversationContext) -> Iterator[Any]:
+        context = messages if isinstance(messages, ConversationContext) else None
+        if context is not None:
+            messages = context.messages()
+        reply: List[str] = []
+        metrics = RequestMetrics(self.model)
+        try:
+            for chunk in self._stream(messages, metrics):
+                metrics.observe(chunk)
+                if context is not None:
+                    reply.append(_chunk_content(chunk) or "")
+                yield chunk
+            if context is not None:
+                context.add("assistant", "".join(reply))
+        except Exception as e:
+            metrics.error = repr(e)
+            raise
+        finally:
+            self._finish_metrics(metrics)
+
+    def _stream(self, messages: List[Dict[str, str]], metrics: RequestMetrics) -> Iterator[Any]:
+        key = self._cache_key(messages)
+        cached = self.cache.get(key) if key else None
+        if cached is not None:
+            metrics.cached = True
+            self.on_loading(True)
+            for chunk in cached:
+                yield chunk
+            self.on_loading(False)
+            return
+        client = self.client or self.registry.get(self.api_key, self.base_url, self.provider)
+        state = _ResumeState(messages, self.resume, self.prefill)
+        self.retry_stats = state.stats
         attempt = 0
-        while attempt <= self.max_retries:
+        while True:
             attempt += 1
+            request = state.begin()
+            self.rate_limiter.acquire(estimate_tokens(request))
             try:
                 stream = client.chat.completions.create(
                     model=self.model,
-                    messages=messages,
+                    messages=request,
                     stream=True,
+                    **self._request_params(),
                 )
                 self.on_loading(True)
-                for chunk in stream:
-                    self.on_item(chunk)
+                try:
+                    for raw in stream:
+                        for chunk in state.feed(raw):
+                            if key:
+                                state.chunks.append(chunk)
+                            yield chunk
+                    for chunk in state.end():
+                        if key:
+                            state.chunks.append(chunk)
+                        yield chunk
+                finally:
+                    # release the connection back to the pool
+                    close = getattr(stream, "close", None)
+                    if close is not None:
+                        close()
                 self.on_loading(False)
+                if key:
+                    self._store(key, state.chunks)
                 return
+            except _ResumeDiverged:
+                # retry at once, now continuing from the delivered text
+                state.failed(0.0)
+            except ResumeMismatch:
+                raise
             except Exception as e:
-                if attempt > self.max_retries:
+                if not self.retry_policy.should_retry(attempt, e):
                     raise
-                time.sleep(0.5 * attempt)
+                delay = self.retry_policy.delay(attempt, e)
+                state.failed(delay)
+                time.sleep(delay)
+
+    def _sink(
+        self, messages: List[Dict[str, str]] | ConversationContext, schedule: Any = None
+    ) -> tuple[Callable[[Any], None], Callable[[], None]]:
+        """Return (deliver, finish) for on_item, honouring compact/batch options.
+
+        With a recorder, everything handed to on_item is also appended to
+        the rollout as one turn that ends with ``finish``.  *schedule* lets
+        a batch be flushed once ``batch_interval`` passes without waiting
+        for the next chunk (see ``ChunkBatcher``).
+        """
+        if self.recorder is None:
+            return self._deliver(self.on_item, schedule)
+        recorder = self.recorder
+        recorder.begin_turn(messages.messages() if isinstance(messages, ConversationContext) else messages)
+        on_item = self.on_item
+
+        def recorded(item: Any) -> None:
+            recorder.record(item)
+            on_item(item)
+
+        deliver, finish = self._deliver(recorded, schedule)
+
+        def finish_turn() -> None:
+            try:
+                finish()
+            finally:
+                recorder.end_turn()
+
+        return deliver, finish_turn
+
+    def _deliver(
+        self, on_item: Callable[[Any], None], schedule: Any = None
+    ) -> tuple[Callable[[Any], None], Callable[[], None]]:
+        if self.batch_chunks or self.batch_bytes or self.batch_interval:
+            batcher = ChunkBatcher(
+                on_item,
+                max_chunks=self.batch_chunks,
+                max_bytes=self.batch_bytes,
+                interval=self.batch_interval,
+                schedule=schedule,
+            )
+            return batcher.add, batcher.flush
+        if self.compact:
+            return (lambda chunk: on_item(StreamChunk.from_raw(chunk))), (lambda: None)
+        return on_item, (lambda: None)
+
+    def run(self, messages: List[Dict[str, str]] | ConversationContext) -> None:
+        deliver, finish = self._sink(messages, thread_timer)
+        try:
+            for chunk in self.stream(messages):
+                deliver(chunk)
+        finally:
+            finish()
+
+    async def astream(self, messages: List[Dict[str, str]] | ConversationContext) -> AsyncIterator[Any]:
+        """Async counterpart of :meth:`stream`; many sessions can share one event loop."""
+        context = messages if isinstance(messages, ConversationContext) else None
+        if context is not None:
+            messages = context.messages()
+        reply: List[str] = []
+        metrics = RequestMetrics(self.model)
+        try:
+            async for chunk in self._astream(messages, metrics):
+                metrics.observe(chunk)
+                if context is not None:
+                    reply.append(_chunk_content(chunk) or "")
+                yield chunk
+            if context is not None:
+                context.add("assistant", "".join(reply))
+        except Exception as e:
+            metrics.error = repr(e)
+            raise
+        finally:
+            self._finish_metrics(metrics)
+
+    async def _astream(self, messages: List[Dict[str, str]], metrics: RequestMetrics) -> AsyncIterator[Any]:
+        key = self._cache_key(messages)
+        cached = self.cache.get(key) if key else None
+        if cached is not None:
+            metrics.cached = True
+            self.on_loading(True)
+            for chunk in cached:
+                yield chunk
+            self.on_loading(False)
+            return
+        client = self.client or self.registry.get_async(self.api_key, self.base_url, self.provider)
+        state = _ResumeState(messages, self.resume, self.prefill)
+        self.retry_stats = state.stats
+        attempt = 0
+        while True:
+            attempt += 1
+            request = state.begin()
+            await self.rate_limiter.aacquire(estimate_tokens(request))
+            try:
+                stream = await client.chat.completions.create(
+                    model=self.model,
+                    messages=request,
+                    stream=True,
+                    **self._request_params(),
+                )
+                self.on_loading(True)
+                try:
+                    async for raw in stream:
+                        for chunk in state.feed(raw):
+                            if key:
+                                state.chunks.append(chunk)
+                            yield chunk
+                    for chunk in state.end():
+                        if key:
+                            state.chunks.append(chunk)
+                        yield chunk
+                finally:
+                    close = getattr(stream, "close", None)
+                    if close is not None:
+                        await close()
+                self.on_loading(False)
+                if key:
+                    self._store(key, state.chunks)
+                return
+            except _ResumeDiverged:
+                # retry at once, now continuing from the delivered text
+                state.failed(0.0)
+            except ResumeMismatch:
+                raise
+            except Exception as e:
+                if not self.retry_policy.should_retry(attempt, e):
+                    raise
+                delay = self.retry_policy.delay(attempt, e)
+                state.failed(delay)
+                await asyncio.sleep(delay)
+
+    async def arun(self, messages: List[Dict[str, str]] | ConversationContext) -> None:
+        loop = asyncio.get_running_loop()
+        deliver, finish = self._sink(messages, lambda delay, callback: loop.call_later(delay, callback).cancel)
+        try:
+            async for chunk in self.astream(messages):
+                deliver(chunk)
+        finally:
+            finish()
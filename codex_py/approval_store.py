@@ -0,0 +1,142 @@
+from __future__ import annotations
+import hashlib
+import os
+import shlex
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .config import CONFIG_DIR
+
+DEFAULT_TTL = 30 * 24 * 3600.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS approvals (
+    command TEXT NOT NULL,
+    scope TEXT NOT NULL,
+    approved INTEGER NOT NULL,
+    expires_at REAL,
+    PRIMARY KEY (command, scope)
+) WITHOUT ROWID
+"""
+
+
+def normalize_command(command: Sequence[str], cwd: Path | None = None) -> str:
+    """Key for *command*: its exact argv, with a relative program path resolved.
+
+    Nothing else is normalized.  Quoting, the script text of ``bash -lc`` and
+    the program's directory all change what runs, so ``echo '$(id)'`` and
+    ``echo "$(id)"`` or ``./deploy.sh`` in two checkouts are different keys.
+    """
+    argv = list(command)
+    if argv and os.sep in argv[0] and not os.path.isabs(argv[0]) and cwd is not None:
+        argv[0] = os.path.normpath(os.path.join(str(Path(cwd).resolve()), argv[0]))
+    return shlex.join(argv)
+
+
+def project_root(start: Path) -> Path:
+    start = start.resolve()
+    for directory in (start, *start.parents):
+        if (directory / ".git").exists():
+            return directory
+    return start
+
+
+class ApprovalStore:
+    """Per-project memory of the user's approve/deny decisions.
+
+    Decisions live in SQLite (WAL mode, so several codex processes can share
+    the file) and are mirrored in a dict keyed on (exact command, scope),
+    so a lookup is one dict probe per directory between *cwd* and the project
+    root.  A miss re-reads that command's rows, and the whole mirror is
+    dropped once another process commits (``PRAGMA data_version``), so
+    decisions made or revoked elsewhere are seen on the next lookup.  A
+    decision recorded for a directory also covers its subdirectories.
+    """
+
+    def __init__(self, root: Path, path: Path | None = None, *, ttl: float = DEFAULT_TTL) -> None:
+        self.root = Path(root).resolve()
+        if path is None:
+            digest = hashlib.sha256(str(self.root).encode("utf-8")).hexdigest()[:16]
+            path = CONFIG_DIR / "approvals" / f"{digest}.sqlite3"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), timeout=10, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(_SCHEMA)
+        self._index: Dict[Tuple[str, str], Tuple[bool, Optional[float]]] = {}
+        self._data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        now = time.time()
+        for command, scope, approved, expires_at in self._conn.execute(
+            "SELECT command, scope, approved, expires_at FROM approvals WHERE expires_at IS NULL OR expires_at > ?",
+            (now,),
+        ):
+            self._index[(command, scope)] = (bool(approved), expires_at)
+
+    def _scopes(self, cwd: Path) -> List[str]:
+        cwd = Path(cwd).resolve()
+        if cwd != self.root and self.root not in cwd.parents:
+            return [str(cwd)]
+        scopes = [str(cwd)]
+        while cwd != self.root:
+            cwd = cwd.parent
+            scopes.append(str(cwd))
+        return scopes
+
+    def _check_external_writes(self) -> None:
+        # data_version changes when another connection commits; drop the
+        # mirror then so a decision revoked elsewhere is not served from it
+        version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if version != self._data_version:
+            self._data_version = version
+            self._index.clear()
+
+    def _probe(self, key: str, scopes: List[str]) -> Optional[bool]:
+        now = time.time()
+        for scope in scopes:
+            hit = self._index.get((key, scope))
+            if hit is not None and (hit[1] is None or hit[1] > now):
+                return hit[0]
+        return None
+
+    def lookup(self, command: Sequence[str], cwd: Path) -> Optional[bool]:
+        """The remembered decision for *command* run in *cwd*, if any."""
+        key = normalize_command(command, cwd)
+        scopes = self._scopes(cwd)
+        with self._lock:
+            self._check_external_writes()
+            decision = self._probe(key, scopes)
+            if decision is not None:
+                return decision
+            for scope, approved, expires_at in self._conn.execute(
+                "SELECT scope, approved, expires_at FROM approvals WHERE command = ?", (key,)
+            ):
+                self._index[(key, scope)] = (bool(approved), expires_at)
+            return self._probe(key, scopes)
+
+    def remember(self, command: Sequence[str], cwd: Path, approved: bool, *, ttl: float | None = None) -> None:
+        """Record a decision for *cwd* and below; ``ttl=0`` never expires."""
+        key = normalize_command(command, cwd)
+        scope = str(Path(cwd).resolve())
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.time() + ttl if ttl else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO approvals (command, scope, approved, expires_at) VALUES (?, ?, ?, ?)",
+                (key, scope, int(approved), expires_at),
+            )
+            self._index[(key, scope)] = (approved, expires_at)
+
+    def prune(self) -> int:
+        with self._lock:
+            now = time.time()
+            cur = self._conn.execute("DELETE FROM approvals WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+            self._index = {k: v for k, v in self._index.items() if v[1] is None or v[1] > now}
+            return cur.rowcount
+
+    def close(self) -> None:
+        self._conn.close()
@@ -1,12 +1,18 @@
 from __future__ import annotations
 from dataclasses import dataclass
-from typing import List, Optional, Tuple
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Sequence, Tuple
+import functools
 import os
+import re
 import shlex
 
+if TYPE_CHECKING:
+    from .approval_store import ApprovalStore
+
 ApprovalPolicy = str  # 'suggest', 'auto-edit', 'full-auto'
 
-@dataclass
+@dataclass(frozen=True)
 class SafetyAssessment:
     type: str
     reason: Optional[str] = None
@@ -31,33 +37,166 @@ SAFE_COMMANDS = {
 }
 
 
-def is_safe_command(cmd: List[str]) -> Optional[Tuple[str, str]]:
-    info = SAFE_COMMANDS.get(cmd[0])
-    if info:
-        return info
-    if cmd[0] == "git" and len(cmd) > 1:
-        sub = cmd[1]
-        if sub in {"status", "branch", "log", "diff", "show"}:
-            return (f"Git {sub}", "Using git")
-    if cmd[0] == "cargo" and len(cmd) > 1 and cmd[1] == "check":
+GIT_READ_ONLY = frozenset({"status", "branch", "log", "diff", "show"})
+FIND_UNSAFE_OPTIONS = frozenset(
+    {"-exec", "-execdir", "-ok", "-okdir", "-delete", "-fls", "-fprint", "-fprint0", "-fprintf"}
+)
+_SED_N_RE = re.compile(r"(\d+,)?\d+p\Z")
+
+Rule = Callable[[Tuple[str, ...]], Optional[Tuple[str, str]]]
+
+
+def _git(cmd: Tuple[str, ...]) -> Optional[Tuple[str, str]]:
+    if len(cmd) > 1 and cmd[1] in GIT_READ_ONLY:
+        return (f"Git {cmd[1]}", "Using git")
+    return None
+
+
+def _cargo(cmd: Tuple[str, ...]) -> Optional[Tuple[str, str]]:
+    if len(cmd) > 1 and cmd[1] == "check":
         return ("Cargo check", "Running command")
-    if cmd[0] == "find":
-        unsafe = {"-exec", "-execdir", "-ok", "-okdir", "-delete", "-fls", "-fprint", "-fprint0", "-fprintf"}
-        if any(arg in unsafe for arg in cmd):
-            return None
-        return ("Find files", "Searching")
-    if cmd[0] == "sed" and len(cmd) >= 3 and cmd[1] == "-n" and _valid_sed_n(cmd[2]):
+    return None
+
+
+def _find(cmd: Tuple[str, ...]) -> Optional[Tuple[str, str]]:
+    if not FIND_UNSAFE_OPTIONS.isdisjoint(cmd):
+        return None
+    return ("Find files", "Searching")
+
+
+def _sed(cmd: Tuple[str, ...]) -> Optional[Tuple[str, str]]:
+    if len(cmd) >= 3 and cmd[1] == "-n" and _valid_sed_n(cmd[2]):
         return ("Sed print subset", "Reading files")
     return None
 
 
+SHELLS = frozenset({"bash", "sh", "zsh"})
+_SHELL_FLAGS = frozenset({"-c", "-lc", "-cl"})
+_SEPARATORS = frozenset({"&&", "||", ";", "|"})
+_GROUPING = frozenset({"(", ")", "{", "}"})
+_WRITE_REDIRECTS = frozenset({">", ">>", ">|", "&>"})
+_DUP_REDIRECTS = frozenset({">&", "<&"})
+# command/process substitution and here-docs are never auto-approved
+_UNSAFE_SHELL_SYNTAX = ("$(", "`", "<(", ">(", "<<")
+
+
+@functools.lru_cache(maxsize=1024)
+def parse_shell_script(script: str) -> Optional[Tuple[Tuple[str, ...], ...]]:
+    """Split *script* into the simple commands of its pipelines and lists.
+
+    ``&&``, ``||``, ``;`` and ``|`` separate commands and subshell or brace
+    grouping is flattened, each grouping token ending the command before it.
+    Returns ``None`` for anything that cannot be shown harmless this way:
+    substitutions, here-docs, background jobs, function definitions,
+    unbalanced quotes, multi-line scripts, or a redirection that writes to a
+    file other than ``/dev/null``.
+    """
+    if any(syntax in script for syntax in _UNSAFE_SHELL_SYNTAX):
+        return None
+    # shlex treats a newline as plain whitespace, but bash runs each line as
+    # a separate command
+    if "\n" in script or "\r" in script:
+        return None
+    lexer = shlex.shlex(script, posix=True, punctuation_chars=True)
+    lexer.whitespace_split = True
+    # bash only starts a comment at the beginning of a word; shlex would drop
+    # the rest of the line after any '#', hiding commands bash still runs
+    lexer.commenters = ""
+    try:
+        tokens = list(lexer)
+    except ValueError:
+        return None
+    commands: List[Tuple[str, ...]] = []
+    current: List[str] = []
+    it = iter(tokens)
+    for token in it:
+        if token in _SEPARATORS:
+            if current:
+                commands.append(tuple(current))
+            current = []
+        elif token in _GROUPING:
+            # 'name ( )' defines a function called name instead of running it
+            if token == "(" and current:
+                return None
+            if current:
+                commands.append(tuple(current))
+            current = []
+        elif token == "<":
+            if next(it, None) is None:
+                return None
+        elif token in _DUP_REDIRECTS:
+            target = next(it, None)
+            if target is None or not (target.isdigit() or target == "-" or target == "/dev/null"):
+                return None
+        elif token in _WRITE_REDIRECTS:
+            if next(it, None) != "/dev/null":
+                return None
+        elif token and all(c in "();<>|&" for c in token):
+            return None  # '&', ';;', '|&', ...
+        else:
+            current.append(token)
+    if current:
+        commands.append(tuple(current))
+    return tuple(commands) if commands else None
+
+
+def _shell(cmd: Tuple[str, ...]) -> Optional[Tuple[str, str]]:
+    if len(cmd) != 3 or cmd[1] not in _SHELL_FLAGS:
+        return None
+    commands = parse_shell_script(cmd[2])
+    if commands is None:
+        return None
+    verdicts = [_classify(part) for part in commands]
+    if not all(verdicts):
+        return None
+    if len(verdicts) == 1:
+        return verdicts[0]
+    reasons = list(dict.fromkeys(reason for reason, _ in verdicts))
+    return ("; ".join(reasons), verdicts[0][1])
+
+
+def _compile_rules() -> Dict[str, Rule]:
+    rules: Dict[str, Rule] = {name: (lambda cmd, info=info: info) for name, info in SAFE_COMMANDS.items()}
+    rules.update(git=_git, cargo=_cargo, find=_find, sed=_sed)
+    rules.update({shell: _shell for shell in SHELLS})
+    return rules
+
+
+# SAFE_COMMANDS and the special cases above, resolved by one dict lookup on
+# argv[0].  Call reload_rules() after changing SAFE_COMMANDS at runtime.
+_RULES = _compile_rules()
+
+
+def reload_rules() -> None:
+    global _RULES
+    _RULES = _compile_rules()
+    _classify.cache_clear()
+    _assess.cache_clear()
+
+
+@functools.lru_cache(maxsize=4096)
+def _classify(cmd: Tuple[str, ...]) -> Optional[Tuple[str, str]]:
+    if not cmd:
+        return None
+    rule = _RULES.get(cmd[0])
+    return rule(cmd) if rule is not None else None
+
+
+def is_safe_command(cmd: List[str]) -> Optional[Tuple[str, str]]:
+    return _classify(tuple(cmd))
+
+
 def _valid_sed_n(arg: str) -> bool:
-    import re
-    return bool(re.match(r"^(\d+,)?\d+p$", arg or ""))
+    return bool(_SED_N_RE.match(arg or ""))
 
 
 def can_auto_approve(command: List[str], policy: ApprovalPolicy) -> SafetyAssessment:
-    safe = is_safe_command(command)
+    return _assess(tuple(command), policy)
+
+
+@functools.lru_cache(maxsize=4096)
+def _assess(command: Tuple[str, ...], policy: ApprovalPolicy) -> SafetyAssessment:
+    safe = _classify(command)
     if safe:
         reason, group = safe
         return SafetyAssessment(type="auto-approve", reason=reason, group=group)
@@ -68,4 +207,103 @@ def can_auto_approve(command: List[str], policy: ApprovalPolicy) -> SafetyAssess
             group="Running commands",
             run_in_sandbox=True,
         )
-    return SafetyAssessment(type="ask-user")
+    return SafetyAssessment(type="ask-user", group=_review_group(command))
+
+
+def _review_group(command: Tuple[str, ...]) -> str:
+    if not command:
+        return "Running commands"
+    program = os.path.basename(command[0])
+    if program in SHELLS:
+        return "Running shell scripts"
+    return f"Running {program}"
+
+
+def can_auto_approve_many(commands: Sequence[List[str]], policy: ApprovalPolicy) -> List[SafetyAssessment]:
+    """Assess a whole plan of commands in one pass (repeats hit the cache)."""
+    return [_assess(tuple(command), policy) for command in commands]
+
+
+def group_for_review(assessments: Sequence[SafetyAssessment]) -> Dict[str, List[int]]:
+    """Indices of the commands that need the user, keyed by assessment group."""
+    groups: Dict[str, List[int]] = {}
+    for i, assessment in enumerate(assessments):
+        if assessment.type == "ask-user":
+            groups.setdefault(assessment.group or "Running commands", []).append(i)
+    return groups
+
+
+def _review_in_tui(command: List[str]) -> bool:
+    from .tui import ReviewApp
+
+    return ReviewApp(command).run() == "yes"
+
+
+def approve_command(
+    command: List[str],
+    policy: ApprovalPolicy,
+    cwd: Path,
+    *,
+    store: "ApprovalStore | None" = None,
+    review: Callable[[List[str]], bool] | None = None,
+) -> bool:
+    """Decide whether *command* may run in *cwd*.
+
+    Safe commands (and everything in full-auto) are approved outright; for
+    the rest a decision remembered in *store* is used before asking *review*
+    (``ReviewApp`` by default), whose answer is then remembered.
+    """
+    if can_auto_approve(command, policy).type == "auto-approve":
+        return True
+    if store is not None:
+        remembered = store.lookup(command, cwd)
+        if remembered is not None:
+            return remembered
+    approved = bool((review or _review_in_tui)(command))
+    if store is not None:
+        store.remember(command, cwd, approved)
+    return approved
+
+
+def _review_batch_in_tui(commands: List[List[str]], groups: Dict[str, List[int]]) -> List[int]:
+    from .tui import BatchReviewApp
+
+    return BatchReviewApp(commands, groups).run() or []
+
+
+def approve_commands(
+    commands: Sequence[List[str]],
+    policy: ApprovalPolicy,
+    cwd: Path,
+    *,
+    store: "ApprovalStore | None" = None,
+    review: Callable[[List[List[str]], Dict[str, List[int]]], Sequence[int]] | None = None,
+) -> List[bool]:
+    """Batch form of :func:`approve_command` for a whole plan.
+
+    Commands that are neither safe nor remembered are grouped with
+    :func:`group_for_review` and shown to *review* (``BatchReviewApp`` by
+    default) in one pass; it returns the indices the user approved.
+    """
+    commands = [list(command) for command in commands]
+    assessments = can_auto_approve_many(commands, policy)
+    decisions = [a.type == "auto-approve" for a in assessments]
+    groups: Dict[str, List[int]] = {}
+    for group, indices in group_for_review(assessments).items():
+        pending = []
+        for i in indices:
+            remembered = store.lookup(commands[i], cwd) if store is not None else None
+            if remembered is None:
+                pending.append(i)
+            else:
+                decisions[i] = remembered
+        if pending:
+            groups[group] = pending
+    if groups:
+        approved = set((review or _review_batch_in_tui)(commands, groups))
+        for indices in groups.values():
+            for i in indices:
+                decisions[i] = i in approved
+                if store is not None:
+                    store.remember(commands[i], cwd, decisions[i])
+    return decisions
@@ -0,0 +1,95 @@
+from __future__ import annotations
+import asyncio
+import json
+from typing import Any, Callable, Dict, Iterable, Iterator, List, TextIO
+
+from .agent_loop import AgentLoop, _chunk_content
+from .context import ConversationContext
+
+BatchItem = Dict[str, Any]
+
+
+def read_batch(lines: Iterable[str]) -> Iterator[BatchItem]:
+    """Parse JSONL prompts: a JSON string, or an object with ``prompt`` or ``messages``."""
+    for lineno, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            item = json.loads(line)
+        except ValueError as e:
+            yield {"error": f"line {lineno}: invalid JSON: {e}"}
+            continue
+        if isinstance(item, str):
+            item = {"prompt": item}
+        if not isinstance(item, dict) or not ("prompt" in item or "messages" in item):
+            yield {"error": f"line {lineno}: expected a string or an object with 'prompt' or 'messages'"}
+            continue
+        yield item
+
+
+async def _run_item(index: int, item: BatchItem, make_agent: Callable[[BatchItem], AgentLoop]) -> Dict[str, Any]:
+    result: Dict[str, Any] = {"index": index, "id": item.get("id", index)}
+    try:
+        if "error" in item:
+            raise ValueError(item["error"])
+        agent = make_agent(item)
+        if "messages" in item:
+            messages: Any = item["messages"]
+        else:
+            messages = ConversationContext(agent.model, instructions=agent.instructions)
+            messages.add("user", item["prompt"])
+        parts: List[str] = []
+        async for chunk in agent.astream(messages):
+            parts.append(_chunk_content(chunk) or "")
+        result["output"] = "".join(parts)
+    except Exception as e:  # one bad item must not sink the batch
+        result["error"] = f"{type(e).__name__}: {e}"
+    return result
+
+
+async def run_batch(
+    items: Iterable[BatchItem],
+    make_agent: Callable[[BatchItem], AgentLoop],
+    emit: Callable[[Dict[str, Any]], None],
+    *,
+    concurrency: int = 8,
+    ordered: bool = True,
+) -> int:
+    """Run *items* through ``AgentLoop.astream`` with at most *concurrency* in flight.
+
+    Results are passed to *emit* in input order, or as they finish when
+    *ordered* is false.  Returns the number of failed items.
+    """
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1")
+    source = iter(enumerate(items))
+    pending: Dict[int, Dict[str, Any]] = {}
+    next_index = 0
+    failures = 0
+
+    def deliver(result: Dict[str, Any]) -> None:
+        nonlocal next_index, failures
+        failures += "error" in result
+        if not ordered:
+            emit(result)
+            return
+        pending[result["index"]] = result
+        while next_index in pending:
+            emit(pending.pop(next_index))
+            next_index += 1
+
+    async def worker() -> None:
+        for index, item in source:
+            deliver(await _run_item(index, item, make_agent))
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return failures
+
+
+def write_jsonl(out: TextIO) -> Callable[[Dict[str, Any]], None]:
+    def emit(result: Dict[str, Any]) -> None:
+        out.write(json.dumps(result, ensure_ascii=False) + "\n")
+        out.flush()
+
+    return emit
@@ -0,0 +1,68 @@
+"""Classifications/sec for ``can_auto_approve`` on a recorded command corpus.
+
+``cold`` clears the decision cache before every pass, so it measures the
+compiled dispatch table alone; ``warm`` is the steady state inside a session
+where agents repeat the same commands.
+
+    python -m codex_py.benchmarks.bench_approvals --passes 2000
+"""
+from __future__ import annotations
+import argparse
+import time
+
+from codex_py import approvals
+
+# argv as emitted by agents during a typical exploration/edit session
+CORPUS = [
+    ["ls", "-la"],
+    ["pwd"],
+    ["cat", "README.md"],
+    ["cat", "src/main.rs"],
+    ["rg", "-n", "fn main", "src"],
+    ["rg", "--files"],
+    ["grep", "-rn", "TODO", "."],
+    ["head", "-n", "50", "Cargo.toml"],
+    ["tail", "-n", "20", "CHANGELOG.md"],
+    ["wc", "-l", "src/lib.rs"],
+    ["nl", "-ba", "src/lib.rs"],
+    ["sed", "-n", "1,120p", "src/lib.rs"],
+    ["sed", "-n", "200,260p", "src/agent.rs"],
+    ["sed", "-i", "s/foo/bar/", "src/lib.rs"],
+    ["find", ".", "-name", "*.rs"],
+    ["find", ".", "-name", "*.orig", "-delete"],
+    ["git", "status"],
+    ["git", "diff", "--stat"],
+    ["git", "log", "--oneline", "-n", "5"],
+    ["git", "commit", "-m", "wip"],
+    ["cargo", "check"],
+    ["cargo", "test"],
+    ["python", "-m", "pytest", "-q"],
+    ["npm", "test"],
+    ["echo", "done"],
+    ["which", "python"],
+    ["rm", "-rf", "target"],
+    ["mkdir", "-p", "build"],
+]
+
+
+def run(passes: int, cold: bool) -> float:
+    start = time.perf_counter()
+    for _ in range(passes):
+        if cold:
+            approvals._classify.cache_clear()
+            approvals._assess.cache_clear()
+        for cmd in CORPUS:
+            approvals.can_auto_approve(cmd, "suggest")
+    return passes * len(CORPUS) / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--passes", type=int, default=2000)
+    args = parser.parse_args()
+    print(f"cold {run(args.passes, cold=True):12,.0f} classifications/s")
+    print(f"warm {run(args.passes, cold=False):12,.0f} classifications/s")
+
+
+if __name__ == "__main__":
+    main()
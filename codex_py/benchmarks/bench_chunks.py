@@ -0,0 +1,67 @@
+"""Chunks/sec through ``AgentLoop.run`` for the CLI's delivery paths.
+
+* raw:     one ``typer.echo(json.dumps(chunk))`` per chunk (default CLI output)
+* quiet:   one ``typer.echo(content, nl=False)`` per chunk (old ``-q`` path)
+* batched: ``batch_bytes``/``batch_interval`` coalescing with ``StreamChunk``
+
+Output goes to an in-memory buffer so terminal speed does not skew results.
+
+    python -m codex_py.benchmarks.bench_chunks --chunks 200000
+"""
+from __future__ import annotations
+import argparse
+import contextlib
+import io
+import json
+import time
+
+import typer
+
+from codex_py.agent_loop import AgentLoop
+
+
+class _Client:
+    def __init__(self, chunks: int) -> None:
+        self.chat = self
+        self.completions = self
+        self.chunks = chunks
+
+    def create(self, **kwargs):
+        return ({"choices": [{"index": 0, "delta": {"content": "tok "}, "finish_reason": None}]} for _ in range(self.chunks))
+
+
+def _raw(it) -> None:
+    typer.echo(json.dumps(it))
+
+
+def _quiet(it) -> None:
+    content = it["choices"][0]["delta"].get("content")
+    if content:
+        typer.echo(content, nl=False)
+
+
+def _batched(it) -> None:
+    if it.content:
+        typer.echo(it.content, nl=False)
+
+
+def bench(name: str, chunks: int, on_item, **options) -> None:
+    agent = AgentLoop("bench", api_key="x", client=_Client(chunks), on_item=on_item, **options)
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        agent.run([])
+        elapsed = time.perf_counter() - start
+    print(f"{name:8} {chunks / elapsed:12,.0f} chunks/s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=100_000)
+    args = parser.parse_args()
+    bench("raw", args.chunks, _raw)
+    bench("quiet", args.chunks, _quiet)
+    bench("batched", args.chunks, _batched, batch_bytes=4096, batch_interval=0.05)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""Calls/sec for repeated ``load_config`` against a throwaway config dir.
+
+``cold`` clears the parse cache before every call, which is what every call
+cost before results were cached; ``warm`` only pays for the ``stat`` checks.
+
+    python -m codex_py.benchmarks.bench_config --calls 5000
+"""
+from __future__ import annotations
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+
+from codex_py import config
+
+
+def run(calls: int, cold: bool, config_path: Path, instructions_path: Path) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        if cold:
+            config.clear_config_cache()
+        config.load_config(config_path, instructions_path, bootstrap=False)
+    return calls / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=5000)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        config_path = Path(tmp) / "config.json"
+        instructions_path = Path(tmp) / "instructions.md"
+        config_path.write_text(json.dumps({"model": "gpt-4.1", "provider": "openai"}), "utf-8")
+        instructions_path.write_text("Be concise.\n" * 200, "utf-8")
+        print(f"cold {run(args.calls, True, config_path, instructions_path):12,.0f} calls/s")
+        print(f"warm {run(args.calls, False, config_path, instructions_path):12,.0f} calls/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Compare thread-per-session ``AgentLoop.run`` with event-loop ``AgentLoop.arun``.
+
+Each session streams ``--chunks`` chunks from a fake client that waits
+``--latency`` seconds per chunk, which stands in for network time.  The
+report shows wall time and sessions completed per CPU-second for both modes.
+
+    python -m codex_py.benchmarks.bench_sessions --sessions 200
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import threading
+import time
+
+import codex_py.agent_loop as ag
+from codex_py.agent_loop import AgentLoop
+
+CHUNK = {"choices": [{"delta": {"content": "tok"}}]}
+
+
+class _SyncClient:
+    def __init__(self, chunks: int, latency: float) -> None:
+        self.chat = self
+        self.completions = self
+        self.chunks = chunks
+        self.latency = latency
+
+    def create(self, **kwargs):
+        for _ in range(self.chunks):
+            time.sleep(self.latency)
+            yield CHUNK
+
+
+class _AsyncClient(_SyncClient):
+    async def create(self, **kwargs):
+        return self._stream()
+
+    async def _stream(self):
+        for _ in range(self.chunks):
+            await asyncio.sleep(self.latency)
+            yield CHUNK
+
+
+def _install(chunks: int, latency: float) -> None:
+    ag.openai = type(
+        "fake_openai",
+        (),
+        {
+            "OpenAI": staticmethod(lambda **kw: _SyncClient(chunks, latency)),
+            "AsyncOpenAI": staticmethod(lambda **kw: _AsyncClient(chunks, latency)),
+        },
+    )
+
+
+def _measure(fn) -> tuple[float, float]:
+    wall, cpu = time.perf_counter(), time.process_time()
+    fn()
+    return time.perf_counter() - wall, time.process_time() - cpu
+
+
+def bench_threads(sessions: int) -> tuple[float, float]:
+    def run() -> None:
+        threads = [
+            threading.Thread(target=AgentLoop("bench", api_key="x").run, args=([],))
+            for _ in range(sessions)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    return _measure(run)
+
+
+def bench_async(sessions: int) -> tuple[float, float]:
+    async def main() -> None:
+        await asyncio.gather(*(AgentLoop("bench", api_key="x").arun([]) for _ in range(sessions)))
+
+    return _measure(lambda: asyncio.run(main()))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--chunks", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.002)
+    args = parser.parse_args()
+    _install(args.chunks, args.latency)
+    for name, bench in (("threads", bench_threads), ("asyncio", bench_async)):
+        wall, cpu = bench(args.sessions)
+        print(
+            f"{name:8} sessions={args.sessions} wall={wall:.3f}s cpu={cpu:.3f}s "
+            f"sessions/cpu-s={args.sessions / max(cpu, 1e-9):.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Cold-start cost of ``codex --completion bash``.
+
+Runs the command in fresh interpreters, reports the median wall time and
+the slowest imports from ``python -X importtime``.
+
+    python -m codex_py.benchmarks.bench_startup --runs 10
+"""
+from __future__ import annotations
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+COMMAND = "from codex_py.cli import app\ntry:\n    app(['--completion', 'bash'])\nexcept SystemExit:\n    pass\n"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    times = []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", COMMAND], check=True, stdout=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    baseline = []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "pass"], check=True)
+        baseline.append(time.perf_counter() - start)
+    print(f"codex --completion bash: median {statistics.median(times) * 1000:.1f} ms")
+    print(f"bare interpreter:        median {statistics.median(baseline) * 1000:.1f} ms")
+
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", COMMAND], check=True, capture_output=True, text=True
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        own, cumulative, name = line[len("import time:") :].split("|")
+        rows.append((int(cumulative), int(own), name.strip()))
+    print("\nslowest imports (cumulative us):")
+    for cumulative, own, name in sorted(rows, reverse=True)[: args.top]:
+        print(f"{cumulative:>10} {own:>8}  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+from __future__ import annotations
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .config import CONFIG_DIR
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_TTL = 7 * 24 * 3600.0
+# writes between full directory scans while the tracked size is under budget
+SCAN_INTERVAL = 100
+
+
+def _to_jsonable(chunk: Any) -> Any:
+    if isinstance(chunk, dict):
+        return chunk
+    dump = getattr(chunk, "model_dump", None)
+    return dump(exclude_none=True) if dump is not None else chunk
+
+
+class ResponseCache:
+    """Content-addressed on-disk store of streamed responses.
+
+    Each entry is a JSONL file holding one chunk per line, so a hit replays
+    the original chunk boundaries.  A file's mtime is its creation time (TTL)
+    and its atime, set explicitly on every hit, drives LRU eviction.  Replayed
+    chunks are plain dicts even when the live stream yielded model objects.
+
+    ``put`` keeps a running total of the directory size and only scans the
+    directory when that total goes over ``max_bytes`` or every
+    ``SCAN_INTERVAL`` writes, which also picks up expired entries and files
+    written by other processes.
+    """
+
+    def __init__(
+        self,
+        directory: Path | str | None = None,
+        *,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        ttl: float = DEFAULT_TTL,
+    ) -> None:
+        self.directory = Path(directory) if directory else CONFIG_DIR / "cache"
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._size: int | None = None
+        self._writes = 0
+
+    @staticmethod
+    def key(model: str, instructions: str, messages: List[Dict[str, Any]], params: Dict[str, Any] | None = None) -> str:
+        payload = json.dumps(
+            [model, instructions, messages, params or {}], sort_keys=True, separators=(",", ":"), default=str
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.jsonl"
+
+    def get(self, key: str) -> Optional[List[Any]]:
+        path = self._path(key)
+        try:
+            st = path.stat()
+            if time.time() - st.st_mtime > self.ttl:
+                path.unlink()
+                raise FileNotFoundError(path)
+            with path.open("r", encoding="utf-8") as f:
+                chunks = [json.loads(line) for line in f if line.strip()]
+            os.utime(path, (time.time(), st.st_mtime))
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return chunks
+
+    def put(self, key: str, chunks: List[Any]) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, prefix=f".{key}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                for chunk in chunks:
+                    f.write(json.dumps(_to_jsonable(chunk), separators=(",", ":"), default=str))
+                    f.write("\n")
+            size = os.path.getsize(tmp)
+            try:
+                replaced = path.stat().st_size
+            except OSError:
+                replaced = 0
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+        with self._lock:
+            self.stores += 1
+            self._writes += 1
+            if self._size is not None:
+                self._size += size - replaced
+            scan = self._size is None or self._size > self.max_bytes or self._writes >= SCAN_INTERVAL
+        if scan:
+            self.evict()
+
+    def evict(self) -> None:
+        now = time.time()
+        entries = []
+        for path in self.directory.glob("*.jsonl"):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            if now - st.st_mtime > self.ttl:
+                self._remove(path)
+            else:
+                entries.append((st.st_atime, st.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries, key=lambda e: e[0]):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+        with self._lock:
+            self._size = total
+            self._writes = 0
+
+    def _remove(self, path: Path) -> None:
+        try:
+            path.unlink()
+            self.evictions += 1
+        except OSError:
+            pass
+
+    def clear(self) -> None:
+        for path in self.directory.glob("*.jsonl"):
+            self._remove(path)
+        with self._lock:
+            self._size = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "stores": self.stores, "evictions": self.evictions}
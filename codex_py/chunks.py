@@ -0,0 +1,163 @@
+from __future__ import annotations
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+
+class StreamChunk:
+    """Compact view of one streamed delta (first choice only)."""
+
+    __slots__ = ("content", "role", "finish_reason", "tool_calls", "index")
+
+    def __init__(
+        self,
+        content: str | None = None,
+        role: str | None = None,
+        finish_reason: str | None = None,
+        tool_calls: List[Any] | None = None,
+        index: int = 0,
+    ) -> None:
+        self.content = content
+        self.role = role
+        self.finish_reason = finish_reason
+        self.tool_calls = tool_calls
+        self.index = index
+
+    @classmethod
+    def from_raw(cls, chunk: Any) -> "StreamChunk":
+        if isinstance(chunk, StreamChunk):
+            return chunk
+        if isinstance(chunk, dict):
+            choices = chunk.get("choices") or []
+            if not choices:
+                return cls()
+            choice = choices[0]
+            delta = choice.get("delta") or {}
+            return cls(
+                delta.get("content"),
+                delta.get("role"),
+                choice.get("finish_reason"),
+                delta.get("tool_calls"),
+                choice.get("index", 0),
+            )
+        choices = getattr(chunk, "choices", None) or []
+        if not choices:
+            return cls()
+        choice = choices[0]
+        delta = choice.delta
+        return cls(
+            getattr(delta, "content", None),
+            getattr(delta, "role", None),
+            getattr(choice, "finish_reason", None),
+            getattr(delta, "tool_calls", None),
+            getattr(choice, "index", 0),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        delta: Dict[str, Any] = {}
+        if self.role is not None:
+            delta["role"] = self.role
+        if self.content is not None:
+            delta["content"] = self.content
+        if self.tool_calls:
+            delta["tool_calls"] = self.tool_calls
+        return {"choices": [{"index": self.index, "delta": delta, "finish_reason": self.finish_reason}]}
+
+    def __repr__(self) -> str:
+        return f"StreamChunk(content={self.content!r}, role={self.role!r}, finish_reason={self.finish_reason!r})"
+
+
+class ChunkBatcher:
+    """Coalesces chunks and hands ``on_flush`` one merged :class:`StreamChunk`.
+
+    A batch is flushed once it holds ``max_chunks`` chunks, ``max_bytes``
+    bytes of UTF-8 encoded content, or has been open for ``interval``
+    seconds.  Limits are checked as chunks arrive, so while the model pauses
+    an open batch stays unflushed, unless *schedule* is given:
+    ``schedule(delay, callback)`` must run *callback* after *delay* seconds
+    and return a cancel function (see :func:`thread_timer`), and the batch is
+    then flushed on time even if no further chunk arrives.  ``on_flush`` is
+    never called concurrently.  Call :meth:`flush` when the stream ends.
+    """
+
+    def __init__(
+        self,
+        on_flush: Callable[[StreamChunk], None],
+        *,
+        max_chunks: int | None = None,
+        max_bytes: int | None = None,
+        interval: float | None = None,
+        schedule: Callable[[float, Callable[[], None]], Callable[[], None]] | None = None,
+    ) -> None:
+        self.on_flush = on_flush
+        self.max_chunks = max_chunks
+        self.max_bytes = max_bytes
+        self.interval = interval
+        self.schedule = schedule if interval is not None else None
+        self._lock = threading.RLock()
+        self._cancel: Optional[Callable[[], None]] = None
+        self._generation = 0
+        self._parts: List[str] = []
+        self._tool_calls: List[Any] = []
+        self._count = 0
+        self._bytes = 0
+        self._started = 0.0
+        self._role: Optional[str] = None
+        self._finish_reason: Optional[str] = None
+
+    def add(self, chunk: Any) -> None:
+        chunk = StreamChunk.from_raw(chunk)
+        with self._lock:
+            if not self._count:
+                self._started = time.monotonic()
+                if self.schedule is not None:
+                    generation = self._generation
+                    self._cancel = self.schedule(self.interval, lambda: self._flush_due(generation))
+            self._count += 1
+            if chunk.content:
+                self._parts.append(chunk.content)
+                self._bytes += len(chunk.content.encode("utf-8"))
+            if chunk.tool_calls:
+                self._tool_calls.extend(chunk.tool_calls)
+            self._role = self._role or chunk.role
+            self._finish_reason = chunk.finish_reason or self._finish_reason
+            if (
+                (self.max_chunks is not None and self._count >= self.max_chunks)
+                or (self.max_bytes is not None and self._bytes >= self.max_bytes)
+                or (self.interval is not None and time.monotonic() - self._started >= self.interval)
+            ):
+                self.flush()
+
+    def _flush_due(self, generation: int) -> None:
+        with self._lock:
+            # a timer that fires after its batch was already flushed is stale
+            if generation == self._generation:
+                self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            if not self._count:
+                return
+            if self._cancel is not None:
+                self._cancel()
+                self._cancel = None
+            self._generation += 1
+            merged = StreamChunk(
+                "".join(self._parts) if self._parts else None,
+                self._role,
+                self._finish_reason,
+                self._tool_calls or None,
+            )
+            self._parts = []
+            self._tool_calls = []
+            self._count = self._bytes = 0
+            self._role = self._finish_reason = None
+            self.on_flush(merged)
+
+
+def thread_timer(delay: float, callback: Callable[[], None]) -> Callable[[], None]:
+    """``ChunkBatcher`` schedule that runs *callback* on a daemon timer thread."""
+    timer = threading.Timer(delay, callback)
+    timer.daemon = True
+    timer.start()
+    return timer.cancel
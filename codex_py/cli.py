@@ -2,22 +2,23 @@ from __future__ import annotations
 import json
 import os
 import pathlib
-import subprocess
 import typer
-import webbrowser
-import http.server
-import socketserver
 from typing import Optional
-from .tui import HistoryApp, ReviewApp
 
-from .config import load_config, INSTRUCTIONS_FILEPATH
-from .agent_loop import AgentLoop
-from .approvals import can_auto_approve
+from .config import ConfigError, load_config, INSTRUCTIONS_FILEPATH
+
+# Heavy modules (openai via agent_loop, textual via tui, http.server,
+# subprocess, ...) are imported inside the branches that use them so that
+# --help, --completion and --view start fast.
 
 app = typer.Typer(invoke_without_command=True)
 
 
 def login_flow() -> str:
+    import http.server
+    import socketserver
+    import webbrowser
+
     token = "dummy-token"
 
     class Handler(http.server.BaseHTTPRequestHandler):
@@ -37,6 +38,41 @@ def login_flow() -> str:
     return token
 
 
+def _print_rollout(path: pathlib.Path, turn: Optional[int] = None, tail: Optional[int] = None) -> None:
+    """Stream *path* to stdout, pretty-printing JSONL records as they are read.
+
+    ``turn`` prints only that turn of a recorded rollout (seeking via its
+    index); ``tail`` prints the last N records.
+    """
+    from .rollout import iter_lines, tail_lines, turn_offset
+
+    if tail:
+        lines = iter(tail_lines(path, tail))
+    else:
+        lines = iter_lines(path, turn_offset(path, turn) if turn is not None else 0)
+    out: list[str] = []
+    pending = 0
+    for raw in lines:
+        text = raw.decode("utf-8", "replace")
+        try:
+            record = json.loads(text)
+        except ValueError:
+            record = None
+        if turn is not None:
+            current = record.get("turn") if isinstance(record, dict) else None
+            if current is None or current < turn:
+                continue
+            if current > turn:
+                break
+        if isinstance(record, (dict, list)):
+            text = json.dumps(record, indent=2, ensure_ascii=False)
+        out.append(text)
+        pending += len(text)
+        if pending >= 65536:
+            typer.echo("\n".join(out))
+            out, pending = [], 0
+    if out:
+        typer.echo("\n".join(out))
 
 
 @app.callback()
@@ -47,21 +83,22 @@ def main(
     provider: Optional[str] = typer.Option(None, "-p", "--provider"),
     view: Optional[str] = typer.Option(None, "-v", "--view"),
     history: bool = typer.Option(False, "--history"),
+    search: Optional[str] = typer.Option(None, "--search", help="With --history, full-text search past sessions"),
+    turn: Optional[int] = typer.Option(None, "--turn", help="With --view, print only turn N"),
+    tail: Optional[int] = typer.Option(None, "--tail", help="With --view, print the last N records"),
     login: bool = typer.Option(False, "--login"),
     config_edit: bool = typer.Option(False, "-c", "--config"),
     completion: Optional[str] = typer.Option(None, "--completion"),
     quiet: bool = typer.Option(False, "-q", "--quiet"),
     full_context: bool = typer.Option(False, "-f", "--full-context"),
+    use_cache: bool = typer.Option(False, "--cache"),
+    batch: Optional[pathlib.Path] = typer.Option(None, "--batch", help="JSONL file of prompts ('-' for stdin)"),
+    concurrency: int = typer.Option(8, "--concurrency", help="Prompts in flight in --batch mode"),
+    unordered: bool = typer.Option(False, "--unordered", help="Emit --batch results as they finish"),
 ):
     """Codex Python CLI"""
     if ctx.invoked_subcommand is not None:
         return
-    config = load_config(is_full_context=full_context)
-    if model:
-        config["model"] = model
-    if provider:
-        config["provider"] = provider
-
     if completion:
         scripts = {
             "bash": "# bash completion for codex\n_codex_completion() {\n  local cur\n  cur=\"${COMP_WORDS[COMP_CWORD]}\"\n  COMPREPLY=( $(compgen -o default -o filenames -- \"${cur}\") )\n}\ncomplete -F _codex_completion codex",
@@ -76,23 +113,50 @@ def main(
         raise typer.Exit()
 
     if view:
-        path = pathlib.Path(view)
-        typer.echo(path.read_text())
+        _print_rollout(pathlib.Path(view), turn=turn, tail=tail)
         raise typer.Exit()
 
+    try:
+        config = load_config(is_full_context=full_context, project_dir=pathlib.Path.cwd())
+    except ConfigError as exc:
+        typer.echo(f"Invalid config: {exc}", err=True)
+        raise typer.Exit(1)
+    if model:
+        config["model"] = model
+    if provider:
+        config["provider"] = provider
+
     if config_edit:
-        # Ensure minimal config exists
-        load_config()
+        import subprocess
+
+        # load_config above already bootstrapped the instructions file
         editor = os.environ.get("EDITOR", "notepad" if os.name == "nt" else "vi")
         subprocess.run([editor, str(INSTRUCTIONS_FILEPATH)])
         raise typer.Exit()
 
     if history:
         history_dir = pathlib.Path.home() / ".codex" / "history"
+        if search is not None:
+            from .history import HistoryIndex
+
+            index = HistoryIndex(history_dir)
+            try:
+                index.refresh()
+                hits = index.search(search)
+            finally:
+                index.close()
+            if not hits:
+                typer.echo("No matching sessions", err=True)
+                raise typer.Exit(1)
+            for hit in hits:
+                typer.echo(f"{hit.name}  turn {hit.turn}  {hit.snippet}")
+            raise typer.Exit()
         if history_dir.exists():
-            content = HistoryApp.run(history_dir)
-            if content:
-                typer.echo(content)
+            from .tui import HistoryApp
+
+            selected = HistoryApp(history_dir).run()
+            if selected:
+                _print_rollout(selected)
         raise typer.Exit()
 
     api_key = os.environ.get("OPENAI_API_KEY", "")
@@ -103,27 +167,97 @@ def main(
             json.dumps({"OPENAI_API_KEY": api_key})
         )
 
+    from .agent_loop import AgentLoop
+    from .cache import ResponseCache
+
+    if batch is not None:
+        import asyncio
+        import sys
+        from .batch import read_batch, run_batch, write_jsonl
+
+        cache = ResponseCache() if use_cache else None
+
+        def make_agent(item):
+            return AgentLoop(
+                model=item.get("model") or config["model"],
+                api_key=api_key,
+                instructions=item.get("instructions", config.get("instructions", "")),
+                provider=config.get("provider"),
+                cache=cache,
+            )
+
+        source = sys.stdin if str(batch) == "-" else batch.open("r", encoding="utf-8")
+        try:
+            failures = asyncio.run(
+                run_batch(
+                    read_batch(source),
+                    make_agent,
+                    write_jsonl(sys.stdout),
+                    concurrency=concurrency,
+                    ordered=not unordered,
+                )
+            )
+        finally:
+            if source is not sys.stdin:
+                source.close()
+        raise typer.Exit(1 if failures else 0)
+
     if not prompt:
         typer.echo("No prompt supplied", err=True)
         raise typer.Exit(1)
 
+    from .context import ConversationContext
+    from .output import TerminalWriter
+
+    writer = TerminalWriter() if quiet else None
+
     def on_item(it):
-        if quiet:
-            if isinstance(it, dict) and "choices" in it:
-                content = it["choices"][0]["delta"].get("content")
-                if content:
-                    typer.echo(content, nl=False)
+        if writer is not None:
+            # batched StreamChunk, see AgentLoop(batch_*) below
+            if it.content:
+                writer.write(it.content)
         else:
             typer.echo(json.dumps(it))
 
-    # simple approval handling
-    def on_command(command: list[str]) -> bool:
-        assessment = can_auto_approve(command, "suggest")
-        if assessment.type == "auto-approve":
-            return True
-        result = ReviewApp.run(command)
-        return result == "yes"
+    recorder = None
+    if (config.get("history") or {}).get("saveHistory", True):
+        from concurrent.futures import ThreadPoolExecutor
+        from .history import HISTORY_DIR, HistoryIndex
+        from .rollout import RolloutRecorder, new_rollout_path
+
+        # finished turns are indexed for --history/--search off the main thread
+        history_index = HistoryIndex(HISTORY_DIR)
+        indexer = ThreadPoolExecutor(max_workers=1)
+
+        def close_index(path):
+            indexer.shutdown(wait=True)
+            history_index.close()
+
+        recorder = RolloutRecorder(
+            new_rollout_path(HISTORY_DIR),
+            session={"model": config["model"], "instructions": config.get("instructions", "")},
+            on_turn=lambda path, turn: indexer.submit(history_index.record_turn, path, turn),
+            on_close=close_index,
+        )
 
-    agent = AgentLoop(model=config["model"], api_key=api_key, instructions=config.get("instructions", ""), on_item=on_item)
-    agent.run([{"role": "user", "content": prompt}])
+    agent = AgentLoop(
+        model=config["model"],
+        api_key=api_key,
+        instructions=config.get("instructions", ""),
+        on_item=on_item,
+        provider=config.get("provider"),
+        cache=ResponseCache() if use_cache else None,
+        batch_bytes=4096 if quiet else None,
+        batch_interval=0.05 if quiet else None,
+        recorder=recorder,
+    )
+    context = ConversationContext(config["model"], instructions=config.get("instructions", ""))
+    context.add("user", prompt)
+    try:
+        agent.run(context)
+    finally:
+        if writer is not None:
+            writer.close()
+        if recorder is not None:
+            recorder.close()
 
@@ -1,8 +1,11 @@
 from __future__ import annotations
+import copy
 import json
 import os
+import threading
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Optional, Sequence, Tuple
 
 CONFIG_DIR = Path.home() / ".codex"
 CONFIG_JSON_FILEPATH = CONFIG_DIR / "config.json"
@@ -10,20 +13,97 @@ CONFIG_YAML_FILEPATH = CONFIG_DIR / "config.yaml"
 CONFIG_YML_FILEPATH = CONFIG_DIR / "config.yml"
 INSTRUCTIONS_FILEPATH = CONFIG_DIR / "instructions.md"
 
+# Per-repo files, merged over the global ones from the project root down to
+# the working directory.
+PROJECT_CONFIG_FILENAMES = ("codex.json",)
+PROJECT_INSTRUCTIONS_FILENAMES = ("AGENTS.md", "codex.md")
+
 DEFAULT_AGENTIC_MODEL = "codex-mini-latest"
 DEFAULT_FULL_CONTEXT_MODEL = "gpt-4.1"
 
 
-def _load_yaml(path: Path) -> Dict[str, Any]:
+class ConfigError(ValueError):
+    """A config file exists but cannot be parsed or fails validation."""
+
+    def __init__(self, path: Path, message: str):
+        super().__init__(f"{path}: {message}")
+        self.path = path
+
+
+@lru_cache(maxsize=None)
+def _json_loads():
+    try:
+        import orjson
+    except ImportError:
+        return json.loads
+    return orjson.loads
+
+
+@lru_cache(maxsize=None)
+def _yaml_loader():
+    """``(yaml module, fastest safe loader)`` or ``None`` without PyYAML."""
     try:
         import yaml
-    except Exception:
-        return {}
+    except ImportError:
+        return None
+    return yaml, getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def _load_json(path: Path) -> Any:
+    try:
+        return _json_loads()(path.read_bytes())
+    except ValueError as exc:  # json.JSONDecodeError and orjson.JSONDecodeError
+        raise ConfigError(path, f"invalid JSON: {exc}") from None
+
+
+def _load_yaml(path: Path) -> Any:
+    backend = _yaml_loader()
+    if backend is None:
+        # bootstrap writes JSON (a YAML subset) when PyYAML is missing
+        try:
+            return _load_json(path)
+        except ConfigError:
+            raise ConfigError(path, "PyYAML is required to read YAML config") from None
+    yaml, loader = backend
     try:
-        with path.open("r", encoding="utf-8") as f:
-            return yaml.safe_load(f) or {}
-    except Exception:
+        with path.open("rb") as f:
+            return yaml.load(f, Loader=loader)
+    except yaml.YAMLError as exc:
+        raise ConfigError(path, f"invalid YAML: {exc}") from None
+
+
+# Known keys and their accepted types; unknown keys pass through untouched.
+CONFIG_SCHEMA: Dict[str, Tuple[type, ...]] = {
+    "model": (str,),
+    "provider": (str, type(None)),
+    "instructions": (str,),
+    "approvalMode": (str,),
+    "fullAutoErrorMode": (str,),
+    "notify": (bool,),
+    "providers": (dict,),
+    "history": (dict,),
+}
+
+
+def validate_config(data: Any, path: Path) -> Dict[str, Any]:
+    """Check parsed file contents against ``CONFIG_SCHEMA``."""
+    if data is None:
         return {}
+    if not isinstance(data, dict):
+        raise ConfigError(path, f"expected a mapping, got {type(data).__name__}")
+    for key, types in CONFIG_SCHEMA.items():
+        if key in data and not isinstance(data[key], types):
+            expected = " or ".join("null" if t is type(None) else t.__name__ for t in types)
+            raise ConfigError(path, f"{key!r} must be {expected}, got {type(data[key]).__name__}")
+    return data
+
+
+def _load_stored(path: Path) -> Dict[str, Any]:
+    if path.suffix.lower() in {".yaml", ".yml"}:
+        data = _load_yaml(path)
+    else:
+        data = _load_json(path)
+    return validate_config(data, path)
 
 
 EMPTY_STORED_CONFIG = {"model": ""}
@@ -33,13 +113,85 @@ class AppConfig(Dict[str, Any]):
     pass
 
 
-def load_config(
-    config_path: Path | None = None,
-    instructions_path: Path | None = None,
-    *,
-    is_full_context: bool = False,
-) -> AppConfig:
-    config_path = config_path or CONFIG_JSON_FILEPATH
+# (paths, options) -> (file signatures, parsed config or the error it raised)
+_CACHE: Dict[tuple, Tuple[tuple, Any]] = {}
+_CACHE_LOCK = threading.Lock()
+
+
+def _signature(*paths: Path) -> Tuple[Optional[Tuple[int, int]], ...]:
+    sig = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError:
+            sig.append(None)
+        else:
+            sig.append((st.st_mtime_ns, st.st_size))
+    return tuple(sig)
+
+
+def clear_config_cache() -> None:
+    with _CACHE_LOCK:
+        _CACHE.clear()
+    _scan_dir.cache_clear()
+
+
+def _files_in(directory: Path) -> Tuple[Path, ...]:
+    names = PROJECT_CONFIG_FILENAMES + PROJECT_INSTRUCTIONS_FILENAMES
+    return tuple(directory / name for name in names if (directory / name).is_file())
+
+
+def _mtime_ns(directory: Path) -> int:
+    try:
+        return directory.stat().st_mtime_ns
+    except OSError:
+        return -1
+
+
+def _walk_project(directory: Path) -> Optional[Tuple[Path, ...]]:
+    """Project files from the enclosing git root down to *directory*.
+
+    ``None`` means there is no git root above *directory*.  The chain is
+    rebuilt on every call, but each level's own files come from
+    ``_scan_dir``, so a level costs one ``stat`` unless it changed.
+    """
+    levels = []
+    while True:
+        own, is_root = _scan_dir(directory, _mtime_ns(directory))
+        levels.append(own)
+        if is_root:
+            return tuple(path for files in reversed(levels) for path in files)
+        if directory.parent == directory:
+            return None
+        directory = directory.parent
+
+
+@lru_cache(maxsize=1024)
+def _scan_dir(directory: Path, mtime_ns: int) -> Tuple[Tuple[Path, ...], bool]:
+    # (project files in directory, whether it is a git root), memoized per
+    # (directory, mtime): creating or removing a file bumps the mtime
+    return _files_in(directory), (directory / ".git").exists()
+
+
+def discover_project_files(start: Path) -> Tuple[Path, ...]:
+    """Project config and instruction files that apply to *start*, outermost first.
+
+    Outside a git checkout only *start* itself is searched.  Each lookup
+    costs one ``stat`` per directory up to the git root; files created or
+    removed since the last lookup are picked up, and edits to known files
+    are seen at once.
+    """
+    start = start.resolve()
+    found = _walk_project(start)
+    return _files_in(start) if found is None else found
+
+
+def _read_config(
+    config_path: Path,
+    instructions_path: Path,
+    is_full_context: bool,
+    project_files: Sequence[Path] = (),
+) -> Tuple[Path, AppConfig]:
     if not config_path.exists():
         if config_path == CONFIG_JSON_FILEPATH:
             if CONFIG_YAML_FILEPATH.exists():
@@ -48,16 +200,19 @@ def load_config(
                 config_path = CONFIG_YML_FILEPATH
     stored: Dict[str, Any] = {}
     if config_path.exists():
-        ext = config_path.suffix.lower()
-        try:
-            if ext in {".yaml", ".yml"}:
-                stored = _load_yaml(config_path)
-            else:
-                stored = json.loads(config_path.read_text("utf-8"))
-        except Exception:
-            stored = {}
-    instructions_path = instructions_path or INSTRUCTIONS_FILEPATH
+        stored = dict(_load_stored(config_path))
     instructions = instructions_path.read_text("utf-8") if instructions_path.exists() else ""
+    layers = [instructions]
+    for path in project_files:
+        if path.name in PROJECT_CONFIG_FILENAMES:
+            stored.update(_load_stored(path))
+        else:
+            try:
+                layers.append(path.read_text("utf-8"))
+            except OSError:
+                pass
+    if len(layers) > 1:
+        instructions = "\n\n".join(text.strip("\n") for text in layers if text.strip())
     model = (stored.get("model") or "").strip() or (
         DEFAULT_FULL_CONTEXT_MODEL if is_full_context else DEFAULT_AGENTIC_MODEL
     )
@@ -67,18 +222,20 @@ def load_config(
         instructions=instructions,
     )
     cfg.update(stored)
+    return config_path, cfg
+
 
+def _bootstrap(config_path: Path, instructions_path: Path) -> None:
     # bootstrap minimal config on first run
     if not config_path.exists():
         try:
             config_path.parent.mkdir(parents=True, exist_ok=True)
             if config_path.suffix.lower() in {".yaml", ".yml"}:
-                try:
-                    import yaml
-                except Exception:
+                backend = _yaml_loader()
+                if backend is None:
                     config_path.write_text(json.dumps(EMPTY_STORED_CONFIG, indent=2), "utf-8")
                 else:
-                    config_path.write_text(yaml.safe_dump(EMPTY_STORED_CONFIG), "utf-8")
+                    config_path.write_text(backend[0].safe_dump(EMPTY_STORED_CONFIG), "utf-8")
             else:
                 config_path.write_text(json.dumps(EMPTY_STORED_CONFIG, indent=2), "utf-8")
         except Exception:
@@ -86,7 +243,61 @@ def load_config(
     if not instructions_path.exists():
         try:
             instructions_path.parent.mkdir(parents=True, exist_ok=True)
-            instructions_path.write_text(instructions, "utf-8")
+            instructions_path.write_text("", "utf-8")
         except Exception:
             pass
-    return cfg
+
+
+def load_config(
+    config_path: Path | None = None,
+    instructions_path: Path | None = None,
+    *,
+    is_full_context: bool = False,
+    bootstrap: bool = True,
+    project_dir: Path | None = None,
+) -> AppConfig:
+    """Load the stored config merged with defaults.
+
+    Parsed results are cached on the (mtime, size) of every file that could
+    contribute, so repeated calls cost a few ``stat`` calls and files are
+    re-read only after they change.  With ``bootstrap=False`` missing files
+    are never created, for read-only or embedded use.  Each call returns a
+    fresh copy that callers may modify.
+
+    Files are parsed with ``orjson`` and ``yaml.CSafeLoader`` when installed.
+    A file that does not parse or fails ``CONFIG_SCHEMA`` raises
+    ``ConfigError`` instead of being treated as empty.
+
+    With *project_dir*, ``codex.json`` files found between the enclosing git
+    root and *project_dir* are merged over the stored config (inner wins) and
+    ``AGENTS.md``/``codex.md`` files are appended to the instructions.
+    """
+    config_path = config_path or CONFIG_JSON_FILEPATH
+    instructions_path = instructions_path or INSTRUCTIONS_FILEPATH
+    if config_path == CONFIG_JSON_FILEPATH:
+        candidates: Tuple[Path, ...] = (config_path, CONFIG_YAML_FILEPATH, CONFIG_YML_FILEPATH)
+    else:
+        candidates = (config_path,)
+    project_files = discover_project_files(project_dir) if project_dir is not None else ()
+    candidates += (instructions_path,) + project_files
+    key = (candidates, is_full_context, bootstrap)
+    sig = _signature(*candidates)
+    with _CACHE_LOCK:
+        cached = _CACHE.get(key)
+    if cached is not None and cached[0] == sig:
+        if isinstance(cached[1], ConfigError):
+            raise cached[1]
+        return copy.deepcopy(cached[1])
+    try:
+        resolved, cfg = _read_config(config_path, instructions_path, is_full_context, project_files)
+    except ConfigError as exc:
+        # remember the failure too, so a broken file is not re-parsed per call
+        with _CACHE_LOCK:
+            _CACHE[key] = (sig, exc)
+        raise
+    if bootstrap:
+        _bootstrap(resolved, instructions_path)
+        sig = _signature(*candidates)
+    with _CACHE_LOCK:
+        _CACHE[key] = (sig, cfg)
+    return copy.deepcopy(cfg)
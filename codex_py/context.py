@@ -0,0 +1,148 @@
+from __future__ import annotations
+import functools
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+MODEL_CONTEXT_TOKENS = {
+    "codex-mini-latest": 200_000,
+    "gpt-4.1": 1_047_576,
+    "gpt-4.1-mini": 1_047_576,
+    "gpt-4o": 128_000,
+    "gpt-4o-mini": 128_000,
+    "o3": 200_000,
+    "o4-mini": 200_000,
+}
+DEFAULT_CONTEXT_TOKENS = 128_000
+# room left for the completion itself
+RESPONSE_RESERVE_TOKENS = 8_192
+MESSAGE_OVERHEAD_TOKENS = 4
+
+Message = Dict[str, Any]
+
+
+def _approx_tokens(text: str) -> int:
+    return (len(text) + 3) // 4
+
+
+@functools.lru_cache(maxsize=None)
+def get_tokenizer(model: str) -> Callable[[str], int]:
+    """Token counter for *model*; tiktoken when installed, else ~4 chars/token."""
+    try:
+        import tiktoken
+    except Exception:
+        return _approx_tokens
+    try:
+        encoding = tiktoken.encoding_for_model(model)
+    except KeyError:
+        encoding = tiktoken.get_encoding("o200k_base")
+    return lambda text: len(encoding.encode(text, disallowed_special=()))
+
+
+def context_budget(model: str) -> int:
+    return MODEL_CONTEXT_TOKENS.get(model, DEFAULT_CONTEXT_TOKENS) - RESPONSE_RESERVE_TOKENS
+
+
+class ConversationContext:
+    """Conversation history kept under a per-model token budget.
+
+    Every message is tokenized once when added; the running total lets the
+    oldest turns be dropped (or folded into a summary via *summarizer*)
+    without re-tokenizing the history.  Pass the context itself to
+    ``AgentLoop.run`` and the assistant reply is appended automatically.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        instructions: str = "",
+        *,
+        budget: int | None = None,
+        summarizer: Callable[[List[Message]], str] | None = None,
+    ) -> None:
+        self.model = model
+        self.count_tokens = get_tokenizer(model)
+        self.budget = budget or context_budget(model)
+        self.summarizer = summarizer
+        self._system: Optional[Tuple[Message, int]] = None
+        self._summary: Optional[Tuple[Message, int]] = None
+        self._turns: Deque[Tuple[Message, int]] = deque()
+        self._total = 0
+        self.dropped = 0
+        if instructions:
+            self._system = self._entry({"role": "system", "content": instructions})
+
+    def _entry(self, message: Message) -> Tuple[Message, int]:
+        return message, self.count_tokens(str(message.get("content") or "")) + MESSAGE_OVERHEAD_TOKENS
+
+    @property
+    def tokens(self) -> int:
+        fixed = sum(e[1] for e in (self._system, self._summary) if e is not None)
+        return fixed + self._total
+
+    def add(self, role: str, content: str) -> None:
+        self.add_message({"role": role, "content": content})
+
+    def add_message(self, message: Message) -> None:
+        entry = self._entry(message)
+        self._turns.append(entry)
+        self._total += entry[1]
+        self._trim()
+
+    def _pop_turn(self) -> List[Message]:
+        # a turn is a user message plus everything up to the next user message
+        removed = []
+        while self._turns:
+            message, tokens = self._turns.popleft()
+            self._total -= tokens
+            removed.append(message)
+            if self._turns and self._turns[0][0].get("role") == "user":
+                break
+        return removed
+
+    def _trim(self) -> None:
+        while True:
+            dropped: List[Message] = []
+            while self.tokens > self.budget and len(self._turns) > 1:
+                last = self._turns[-1]
+                dropped.extend(self._pop_turn())
+                if not self._turns:
+                    # never drop the newest message, even if it alone is over budget
+                    self._turns.append(last)
+                    self._total += last[1]
+                    dropped.pop()
+                    break
+            if not dropped:
+                break
+            self.dropped += len(dropped)
+            if self.summarizer is None:
+                break
+            previous = [self._summary[0]] if self._summary else []
+            summary = self.summarizer(previous + dropped)
+            self._summary = self._entry({"role": "system", "content": f"Summary of earlier conversation:\n{summary}"})
+            # the new summary counts too: fold more turns into it if needed
+            if self.tokens <= self.budget:
+                break
+        if self._summary is not None and self.tokens > self.budget:
+            self._fit_summary()
+
+    def _fit_summary(self) -> None:
+        # the summary only gets the room the kept turns leave; cut its tail
+        # to fit, or drop it when there is no room at all
+        room = self.budget - (self.tokens - self._summary[1]) - MESSAGE_OVERHEAD_TOKENS
+        content = str(self._summary[0]["content"])
+        while content and room > 0:
+            used = self.count_tokens(content)
+            if used <= room:
+                break
+            content = content[: min(len(content) - 1, len(content) * room // used)]
+        if room <= 0 or not content:
+            self._summary = None
+        else:
+            self._summary = self._entry({"role": "system", "content": content})
+
+    def messages(self) -> List[Message]:
+        out = [self._system[0]] if self._system else []
+        if self._summary:
+            out.append(self._summary[0])
+        out.extend(message for message, _ in self._turns)
+        return out
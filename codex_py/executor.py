@@ -0,0 +1,209 @@
+from __future__ import annotations
+import codecs
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, List, Optional, Sequence
+
+from .approvals import SafetyAssessment, is_safe_command
+
+DEFAULT_TIMEOUT = 60.0
+DEFAULT_MAX_OUTPUT = 1024 * 1024
+# how long to wait for output after the command exits
+DRAIN_TIMEOUT = 2.0
+
+OutputCallback = Callable[[str, str], None]
+
+
+@dataclass
+class ExecResult:
+    command: List[str]
+    exit_code: Optional[int]
+    stdout: str
+    stderr: str
+    duration: float
+    timed_out: bool = False
+    truncated: bool = False
+    sandboxed: bool = False
+
+
+def sandbox_argv(command: Sequence[str], cwd: Path) -> List[str]:
+    """Wrap *command* for the local sandbox helper.
+
+    Under bubblewrap the whole filesystem is read-only except *cwd* and a
+    private /tmp, and every namespace (network included) is unshared.  There
+    is no fallback: a bare ``unshare`` would cut the network but leave the
+    filesystem writable, which is not a sandbox worth reporting as one.
+    """
+    if not sys.platform.startswith("linux"):
+        raise RuntimeError("sandboxed execution is only supported on Linux")
+    bwrap = shutil.which("bwrap")
+    if not bwrap:
+        raise RuntimeError("sandboxed execution requires bubblewrap (bwrap)")
+    cwd_str = str(cwd)
+    return [
+        bwrap, "--die-with-parent", "--unshare-all",
+        "--ro-bind", "/", "/", "--dev", "/dev", "--proc", "/proc", "--tmpfs", "/tmp",
+        "--bind", cwd_str, cwd_str, "--chdir", cwd_str,
+        "--", *command,
+    ]
+
+
+def _pump(stream, name: str, sink: List[str], budget: List[int], state: dict, on_output: Optional[OutputCallback]) -> None:
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    while True:
+        data = stream.read1(65536) if hasattr(stream, "read1") else stream.read(65536)
+        text = decoder.decode(data, final=not data)
+        if text:
+            if on_output is not None:
+                on_output(name, text)
+            with state["lock"]:
+                if budget[0] > 0:
+                    sink.append(text[: budget[0]])
+                    state["truncated"] |= len(text) > budget[0]
+                    budget[0] -= len(text)
+                else:
+                    state["truncated"] = True
+        if not data:
+            break
+    stream.close()
+
+
+def run_command(
+    command: Sequence[str],
+    *,
+    cwd: Path | None = None,
+    timeout: float = DEFAULT_TIMEOUT,
+    max_output: int = DEFAULT_MAX_OUTPUT,
+    sandbox: bool = False,
+    on_output: OutputCallback | None = None,
+) -> ExecResult:
+    """Run *command*, streaming output to *on_output* as ``(stream, text)``.
+
+    stdout and stderr share a budget of *max_output* characters; the rest is
+    drained and dropped.  On timeout the whole process group is killed, and
+    so is anything in it still holding the pipes ``DRAIN_TIMEOUT`` seconds
+    after the command exits.  Sandboxing needs bubblewrap; without it this
+    raises ``RuntimeError`` rather than running the command unconfined.
+    """
+    cwd = Path(cwd or os.getcwd())
+    argv = sandbox_argv(command, cwd) if sandbox else list(command)
+    start = time.monotonic()
+    try:
+        proc = subprocess.Popen(
+            argv,
+            cwd=cwd,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            start_new_session=True,
+        )
+    except OSError as e:
+        return ExecResult(list(command), 127, "", f"{e}\n", time.monotonic() - start, sandboxed=sandbox)
+    out: List[str] = []
+    err: List[str] = []
+    budget = [max_output]
+    state = {"lock": threading.Lock(), "truncated": False}
+    readers = [
+        threading.Thread(target=_pump, args=(proc.stdout, "stdout", out, budget, state, on_output), daemon=True),
+        threading.Thread(target=_pump, args=(proc.stderr, "stderr", err, budget, state, on_output), daemon=True),
+    ]
+    for reader in readers:
+        reader.start()
+    timed_out = False
+    try:
+        proc.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        timed_out = True
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except OSError:
+            proc.kill()
+        proc.wait()
+    # a background grandchild can hold the pipes open after the command
+    # exits: wait briefly, then kill what is left of the process group
+    deadline = time.monotonic() + DRAIN_TIMEOUT
+    for reader in readers:
+        reader.join(max(0.0, deadline - time.monotonic()))
+    if any(reader.is_alive() for reader in readers):
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except OSError:
+            pass
+        for reader in readers:
+            reader.join(DRAIN_TIMEOUT)
+    return ExecResult(
+        list(command),
+        None if timed_out else proc.returncode,
+        "".join(out),
+        "".join(err),
+        time.monotonic() - start,
+        timed_out=timed_out,
+        truncated=state["truncated"],
+        sandboxed=sandbox,
+    )
+
+
+class CommandExecutor:
+    """Runs approved commands, overlapping the read-only ones.
+
+    ``execute_many`` keeps the plan's order: each maximal run of commands that
+    ``is_safe_command`` classifies as read-only goes through a bounded pool
+    concurrently, while any other command waits for everything before it
+    and runs alone.
+    """
+
+    def __init__(
+        self,
+        *,
+        cwd: Path | None = None,
+        max_workers: int = 4,
+        timeout: float = DEFAULT_TIMEOUT,
+        max_output: int = DEFAULT_MAX_OUTPUT,
+        on_output: Callable[[List[str], str, str], None] | None = None,
+    ) -> None:
+        self.cwd = cwd
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.max_output = max_output
+        self.on_output = on_output
+
+    def execute(self, command: Sequence[str], assessment: SafetyAssessment | None = None) -> ExecResult:
+        callback = None
+        if self.on_output is not None:
+            on_output, argv = self.on_output, list(command)
+            callback = lambda stream, text: on_output(argv, stream, text)
+        return run_command(
+            command,
+            cwd=self.cwd,
+            timeout=self.timeout,
+            max_output=self.max_output,
+            sandbox=bool(assessment and assessment.run_in_sandbox),
+            on_output=callback,
+        )
+
+    def execute_many(
+        self, commands: Sequence[Sequence[str]], assessments: Sequence[SafetyAssessment] | None = None
+    ) -> List[ExecResult]:
+        results: List[Optional[ExecResult]] = [None] * len(commands)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            batch = []
+            for i, command in enumerate(commands):
+                assessment = assessments[i] if assessments else None
+                if is_safe_command(list(command)) and not (assessment and assessment.run_in_sandbox):
+                    batch.append((i, pool.submit(self.execute, command, assessment)))
+                    continue
+                for j, future in batch:
+                    results[j] = future.result()
+                batch = []
+                results[i] = self.execute(command, assessment)
+            for j, future in batch:
+                results[j] = future.result()
+        return results  # type: ignore[return-value]
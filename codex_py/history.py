@@ -0,0 +1,355 @@
+from __future__ import annotations
+import json
+import os
+import sqlite3
+import threading
+import zlib
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .config import CONFIG_DIR
+from .rollout import iter_records
+
+HISTORY_DIR = CONFIG_DIR / "history"
+INDEX_FILENAME = ".index.sqlite3"
+ROLLOUT_SUFFIXES = (".json", ".jsonl", ".jsonl.gz", ".jsonl.zst")
+PROMPT_PREVIEW_CHARS = 200
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rollouts (
+    name TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    timestamp REAL NOT NULL,
+    model TEXT NOT NULL,
+    first_prompt TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS rollouts_by_time ON rollouts (timestamp DESC, name);
+"""
+# message text, one row per turn; SQLite builds without FTS5 get a plain
+# table that search() scans with LIKE instead
+_FTS_SCHEMA = "CREATE VIRTUAL TABLE IF NOT EXISTS rollout_text USING fts5(name UNINDEXED, turn UNINDEXED, content)"
+_PLAIN_SCHEMA = "CREATE TABLE IF NOT EXISTS rollout_plain_text (name TEXT NOT NULL, turn INTEGER NOT NULL, content TEXT NOT NULL)"
+SNIPPET_WORDS = 12
+# bumped when the index layout changes; older indexes are rebuilt on open
+_SCHEMA_VERSION = 2
+
+
+@dataclass(frozen=True)
+class HistoryEntry:
+    name: str
+    timestamp: float
+    model: str
+    first_prompt: str
+    size: int
+
+
+@dataclass(frozen=True)
+class SearchHit:
+    name: str
+    turn: int
+    snippet: str
+
+
+def is_rollout(name: str) -> bool:
+    return not name.startswith(".") and name.endswith(ROLLOUT_SUFFIXES)
+
+
+def _message_text(item: Dict[str, Any]) -> str:
+    content = item.get("content")
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return " ".join(
+            part.get("text", "") for part in content if isinstance(part, dict) and isinstance(part.get("text"), str)
+        )
+    return ""
+
+
+def _parse_timestamp(value: Any) -> Optional[float]:
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value).timestamp()
+        except ValueError:
+            return None
+    return None
+
+
+def metadata_from_items(session: Dict[str, Any], items: Iterable[Any]) -> Tuple[Optional[float], str, str]:
+    """``(timestamp, model, first user prompt)`` from a session header and its items."""
+    prompt = ""
+    for item in items:
+        if isinstance(item, dict) and item.get("role") == "user":
+            prompt = _message_text(item)
+            break
+    prompt = " ".join(prompt.split())[:PROMPT_PREVIEW_CHARS]
+    return _parse_timestamp(session.get("timestamp")), str(session.get("model") or ""), prompt
+
+
+def _records_until_prompt(path: Path) -> Iterator[Dict[str, Any]]:
+    for record in iter_records(path):
+        yield record
+        if record.get("type") == "message" and record.get("role") == "user":
+            return
+
+
+def rollout_metadata(path: Path) -> Tuple[Optional[float], str, str]:
+    """Metadata of a rollout: a JSONL session log or a legacy JSON document.
+
+    JSONL rollouts are read only up to the first user message.
+    """
+    if not path.name.endswith(".json"):
+        try:
+            records = list(_records_until_prompt(path))
+        except (OSError, ValueError, RuntimeError, zlib.error):
+            return None, "", ""
+        session = records[0] if records and records[0].get("type") == "session" else {}
+        return metadata_from_items(session, records)
+    try:
+        doc = json.loads(path.read_bytes())
+    except (OSError, ValueError):
+        return None, "", ""
+    if not isinstance(doc, dict):
+        return None, "", ""
+    session = doc.get("session") if isinstance(doc.get("session"), dict) else {}
+    items = doc.get("items") if isinstance(doc.get("items"), list) else []
+    return metadata_from_items(session, items)
+
+
+def _turn_texts(path: Path, turn: int | None = None) -> Iterator[Tuple[int, str]]:
+    """``(turn, text)`` for each turn of a rollout, or only *turn*.
+
+    A legacy JSON rollout is a single turn 0.
+    """
+    if path.name.endswith(".json"):
+        try:
+            doc = json.loads(path.read_bytes())
+        except (OSError, ValueError):
+            return
+        items = doc.get("items") if isinstance(doc, dict) and isinstance(doc.get("items"), list) else []
+        yield 0, "\n".join(_message_text(item) for item in items if isinstance(item, dict))
+        return
+    current: int | None = None
+    parts: List[str] = []
+    for record in iter_records(path, turn):
+        if record.get("type") != "message":
+            continue
+        n = record.get("turn", 0)
+        if turn is not None and n != turn:
+            if n > turn:
+                break
+            continue
+        if n != current and parts:
+            yield current, "\n".join(parts)
+            parts = []
+        current = n
+        parts.append(_message_text(record))
+    if parts:
+        yield current, "\n".join(parts)
+
+
+def _match_expression(query: str) -> str:
+    # every word must match; quoting keeps FTS5 operators and punctuation literal
+    return " ".join('"' + word.replace('"', '""') + '"' for word in query.split())
+
+
+def _like_pattern(word: str) -> str:
+    return "%" + word.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+def _like_snippet(content: str, words: List[str]) -> str:
+    """Roughly what FTS5's ``snippet()`` gives: a few words around the first
+    match, with matching words in brackets."""
+    needles = [w.lower() for w in words]
+    tokens = content.split()
+    hits = [i for i, token in enumerate(tokens) if any(n in token.lower() for n in needles)]
+    start = max(0, (hits[0] if hits else 0) - SNIPPET_WORDS // 4)
+    shown = [
+        f"[{token}]" if any(n in token.lower() for n in needles) else token
+        for token in tokens[start : start + SNIPPET_WORDS]
+    ]
+    prefix = "..." if start else ""
+    suffix = "..." if start + SNIPPET_WORDS < len(tokens) else ""
+    return prefix + " ".join(shown) + suffix
+
+
+class HistoryIndex:
+    """Sidecar SQLite index of the rollouts in a history directory.
+
+    Each rollout is parsed once; afterwards ``refresh()`` costs one
+    ``scandir`` and re-reads only files whose (mtime, size) changed, and
+    ``record()`` indexes a single file as it is written.  The browser pages
+    through ``entries()`` newest first without touching the rollouts.
+
+    Message text is kept in an FTS5 table with one row per turn, so
+    ``record_turn()`` indexes a growing rollout one turn at a time and
+    ``search()`` answers from the index alone.  Where SQLite lacks FTS5 the
+    text goes into a plain table and ``search()`` falls back to ``LIKE``.
+    """
+
+    def __init__(self, history_dir: Path | None = None, path: Path | None = None) -> None:
+        self.history_dir = Path(history_dir or HISTORY_DIR)
+        self.history_dir.mkdir(parents=True, exist_ok=True)
+        self.path = path or self.history_dir / INDEX_FILENAME
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), timeout=10, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        tables = {name for name, in self._conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        try:
+            self._conn.execute(_FTS_SCHEMA)
+            self.full_text = True
+            self._text_table = "rollout_text"
+        except sqlite3.OperationalError:
+            self.full_text = False
+            self._text_table = "rollout_plain_text"
+            self._conn.execute(_PLAIN_SCHEMA)
+        if self._text_table not in tables or self._conn.execute("PRAGMA user_version").fetchone()[0] < _SCHEMA_VERSION:
+            # rows indexed before this text table existed: re-index on refresh
+            self._conn.execute("DELETE FROM rollouts")
+            self._conn.execute(f"DELETE FROM {self._text_table}")
+            self._conn.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+
+    def _upsert_metadata(self, path: Path, st: os.stat_result) -> None:
+        timestamp, model, prompt = rollout_metadata(path)
+        self._conn.execute(
+            "INSERT OR REPLACE INTO rollouts (name, mtime_ns, size, timestamp, model, first_prompt)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (path.name, st.st_mtime_ns, st.st_size, st.st_mtime if timestamp is None else timestamp, model, prompt),
+        )
+
+    def _upsert(self, path: Path, st: os.stat_result) -> None:
+        self._upsert_metadata(path, st)
+        self._conn.execute(f"DELETE FROM {self._text_table} WHERE name = ?", (path.name,))
+        try:
+            texts = list(_turn_texts(path))
+        except (OSError, RuntimeError, zlib.error):
+            texts = []
+        self._conn.executemany(
+            f"INSERT INTO {self._text_table} (name, turn, content) VALUES (?, ?, ?)",
+            [(path.name, turn, text) for turn, text in texts],
+        )
+
+    def record(self, path: Path) -> None:
+        """Index (or re-index) one rollout file."""
+        path = Path(path)
+        try:
+            st = path.stat()
+        except OSError:
+            return
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._upsert(path, st)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def record_turn(self, path: Path, turn: int) -> None:
+        """Index one finished turn of a rollout that is still being written.
+
+        Seeks to the turn through the rollout's turn index instead of
+        re-reading the whole file.
+        """
+        path = Path(path)
+        try:
+            st = path.stat()
+            texts = list(_turn_texts(path, turn))
+        except (OSError, RuntimeError, zlib.error):
+            return
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                updated = self._conn.execute(
+                    "UPDATE rollouts SET mtime_ns = ?, size = ? WHERE name = ?",
+                    (st.st_mtime_ns, st.st_size, path.name),
+                ).rowcount
+                if not updated:
+                    self._upsert_metadata(path, st)
+                self._conn.execute(f"DELETE FROM {self._text_table} WHERE name = ? AND turn = ?", (path.name, turn))
+                self._conn.executemany(
+                    f"INSERT INTO {self._text_table} (name, turn, content) VALUES (?, ?, ?)",
+                    [(path.name, n, text) for n, text in texts],
+                )
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def refresh(self) -> int:
+        """Bring the index up to date with the directory; returns rows changed."""
+        with self._lock:
+            known = {
+                name: (mtime_ns, size)
+                for name, mtime_ns, size in self._conn.execute("SELECT name, mtime_ns, size FROM rollouts")
+            }
+            changed = 0
+            self._conn.execute("BEGIN")
+            try:
+                with os.scandir(self.history_dir) as it:
+                    for entry in it:
+                        if not is_rollout(entry.name) or not entry.is_file():
+                            continue
+                        st = entry.stat()
+                        if known.pop(entry.name, None) != (st.st_mtime_ns, st.st_size):
+                            self._upsert(Path(entry.path), st)
+                            changed += 1
+                for name in known:
+                    self._conn.execute("DELETE FROM rollouts WHERE name = ?", (name,))
+                    self._conn.execute(f"DELETE FROM {self._text_table} WHERE name = ?", (name,))
+                    changed += 1
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return changed
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM rollouts").fetchone()[0]
+
+    def entries(self, offset: int = 0, limit: int = 100) -> List[HistoryEntry]:
+        """One page of entries, newest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT name, timestamp, model, first_prompt, size FROM rollouts"
+                " ORDER BY timestamp DESC, name LIMIT ? OFFSET ?",
+                (limit, offset),
+            ).fetchall()
+        return [HistoryEntry(*row) for row in rows]
+
+    def search(self, query: str, limit: int = 20) -> List[SearchHit]:
+        """Best-matching turns for *query*, each with a highlighted snippet."""
+        if not self.full_text:
+            return self._search_like(query.split(), limit)
+        expression = _match_expression(query)
+        if not expression:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT name, turn, snippet(rollout_text, 2, '[', ']', '...', 12) FROM rollout_text"
+                " WHERE rollout_text MATCH ? ORDER BY rank LIMIT ?",
+                (expression, limit),
+            ).fetchall()
+        return [SearchHit(name, turn, " ".join(snippet.split())) for name, turn, snippet in rows]
+
+    def _search_like(self, words: List[str], limit: int) -> List[SearchHit]:
+        # no ranking without FTS5: turns containing every word, newest first
+        if not words:
+            return []
+        where = " AND ".join("content LIKE ? ESCAPE '\\'" for _ in words)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT name, turn, content FROM rollout_plain_text WHERE {where} ORDER BY rowid DESC LIMIT ?",
+                (*map(_like_pattern, words), limit),
+            ).fetchall()
+        return [SearchHit(name, turn, _like_snippet(content, words)) for name, turn, content in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
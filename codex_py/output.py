@@ -0,0 +1,142 @@
+from __future__ import annotations
+import queue
+import sys
+import threading
+import time
+from typing import IO, List, Optional
+
+_CLOSE = object()
+
+
+class TerminalWriter:
+    """Writes streamed text from a background thread.
+
+    ``write`` does not block while the writer keeps up: text goes on a
+    bounded queue and, if the writer has fallen behind, is coalesced into an
+    overflow buffer that the writer thread collects along with the queue.
+    Only once ``max_overflow`` characters are waiting does ``write`` block
+    until the writer catches up.  The writer thread joins whatever is queued
+    and flushes on an interval that grows while the sink is slow and shrinks
+    again when it keeps up.  On a TTY completed lines are flushed
+    immediately.
+    """
+
+    def __init__(
+        self,
+        stream: IO[str] | None = None,
+        *,
+        maxsize: int = 256,
+        min_interval: float = 0.01,
+        max_interval: float = 0.25,
+        max_pending: int = 64 * 1024,
+        max_overflow: int = 4 * 1024 * 1024,
+        line_buffered: bool | None = None,
+    ) -> None:
+        self.stream = stream or sys.stdout
+        if line_buffered is None:
+            isatty = getattr(self.stream, "isatty", None)
+            line_buffered = bool(isatty and isatty())
+        self.line_buffered = line_buffered
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.interval = min_interval
+        self.max_pending = max_pending
+        self.max_overflow = max_overflow
+        self.error: Optional[BaseException] = None
+        self._queue: "queue.Queue[object]" = queue.Queue(maxsize)
+        self._overflow: List[str] = []
+        self._overflow_size = 0
+        self._lock = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="codex-terminal-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, text: str) -> None:
+        if not text or self.error is not None:
+            return
+        with self._lock:
+            while self._overflow_size >= self.max_overflow and self.error is None and self._thread.is_alive():
+                self._lock.wait(0.1)
+            if self._overflow:
+                self._overflow.append(text)
+                text = "".join(self._overflow)
+                self._overflow = []
+                self._overflow_size = 0
+            try:
+                self._queue.put_nowait(text)
+            except queue.Full:
+                self._overflow.append(text)
+                self._overflow_size += len(text)
+
+    def _flush(self, pending: List[str]) -> None:
+        start = time.monotonic()
+        self.stream.write("".join(pending))
+        self.stream.flush()
+        # slow sinks get fewer, larger writes
+        elapsed = time.monotonic() - start
+        self.interval = min(self.max_interval, max(self.min_interval, elapsed * 4))
+
+    def _run(self) -> None:
+        pending: List[str] = []
+        size = 0
+        last_flush = time.monotonic()
+        closing = False
+        while not closing:
+            try:
+                item = self._queue.get(timeout=self.interval if pending else None)
+            except queue.Empty:
+                item = None
+            with self._lock:
+                # drain the queue and then the overflow under the lock, so
+                # nothing a producer writes can land between the two
+                while item is not None:
+                    if item is _CLOSE:
+                        closing = True
+                    else:
+                        pending.append(item)  # type: ignore[arg-type]
+                        size += len(item)  # type: ignore[arg-type]
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        item = None
+                if self._overflow:
+                    pending.extend(self._overflow)
+                    size += self._overflow_size
+                    self._overflow = []
+                    self._overflow_size = 0
+                    self._lock.notify_all()
+            if not pending:
+                continue
+            now = time.monotonic()
+            if (
+                closing
+                or size >= self.max_pending
+                or now - last_flush >= self.interval
+                or (self.line_buffered and "\n" in pending[-1])
+            ):
+                try:
+                    self._flush(pending)
+                except Exception as e:  # e.g. BrokenPipeError when the reader went away
+                    with self._lock:
+                        self.error = e
+                        self._lock.notify_all()
+                    return
+                pending = []
+                size = 0
+                last_flush = now
+
+    def close(self) -> None:
+        # the writer collects any overflow itself; a full queue only delays
+        # _CLOSE while the thread is still alive to drain it
+        while self._thread.is_alive():
+            try:
+                self._queue.put(_CLOSE, timeout=0.1)
+                break
+            except queue.Full:
+                continue
+        self._thread.join()
+
+    def __enter__(self) -> "TerminalWriter":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
@@ -0,0 +1,68 @@
+from __future__ import annotations
+import asyncio
+import threading
+import time
+from typing import Any, Dict, List
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at ``per_minute``.
+
+    ``reserve`` always debits and returns how long the caller must wait, so
+    sync and async callers can sleep with their own primitive.
+    """
+
+    def __init__(self, per_minute: float, capacity: float | None = None) -> None:
+        if per_minute <= 0:
+            raise ValueError("per_minute must be positive")
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float = 1.0) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # requests larger than the bucket would otherwise wait forever
+            self.tokens -= min(amount, self.capacity)
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class RateLimiter:
+    """Request and token budgets per minute; unlimited until configured."""
+
+    def __init__(self, requests_per_minute: float | None = None, tokens_per_minute: float | None = None) -> None:
+        self.configure(requests_per_minute, tokens_per_minute)
+
+    def configure(self, requests_per_minute: float | None = None, tokens_per_minute: float | None = None) -> None:
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+
+    def reserve(self, tokens: int = 0) -> float:
+        wait = 0.0
+        if self.requests is not None:
+            wait = self.requests.reserve(1)
+        if self.tokens is not None and tokens:
+            wait = max(wait, self.tokens.reserve(tokens))
+        return wait
+
+    def acquire(self, tokens: int = 0) -> None:
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def aacquire(self, tokens: int = 0) -> None:
+        wait = self.reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+def estimate_tokens(messages: List[Dict[str, Any]]) -> int:
+    # ~4 characters per token plus per-message framing
+    return sum(len(str(m.get("content") or "")) // 4 + 4 for m in messages)
+
+
+shared_limiter = RateLimiter()
@@ -0,0 +1,81 @@
+from __future__ import annotations
+import email.utils
+import random
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+RETRYABLE_STATUS = frozenset({408, 409, 429})
+
+# Transport failures from openai/httpx, matched by name so neither is imported here.
+_TRANSIENT_ERRORS = frozenset({"APIConnectionError", "APITimeoutError", "TransportError"})
+
+
+def status_code(exc: BaseException) -> Optional[int]:
+    code = getattr(exc, "status_code", None)
+    if code is None:
+        code = getattr(getattr(exc, "response", None), "status_code", None)
+    return code if isinstance(code, int) else None
+
+
+def retry_after(exc: BaseException) -> Optional[float]:
+    """Seconds the server asked us to wait, from ``retry-after-ms``/``retry-after``."""
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return max(0.0, float(value) / 1000)
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+@dataclass
+class RetryPolicy:
+    """Exponential backoff with full jitter that honours ``Retry-After``.
+
+    No single wait exceeds ``max_delay``: a server asking for longer is not
+    retried at all, since coming back early would only be throttled again.
+    """
+
+    max_retries: int = 3
+    base_delay: float = 0.5
+    max_delay: float = 30.0
+    respect_retry_after: bool = True
+
+    def is_retryable(self, exc: BaseException) -> bool:
+        code = status_code(exc)
+        if code is not None:
+            return code in RETRYABLE_STATUS or code >= 500
+        if isinstance(exc, (ConnectionError, TimeoutError)):
+            return True
+        return any(cls.__name__ in _TRANSIENT_ERRORS for cls in type(exc).__mro__)
+
+    def should_retry(self, attempt: int, exc: BaseException) -> bool:
+        if attempt > self.max_retries or not self.is_retryable(exc):
+            return False
+        if self.respect_retry_after:
+            wait = retry_after(exc)
+            if wait is not None and wait > self.max_delay:
+                return False
+        return True
+
+    def delay(self, attempt: int, exc: BaseException | None = None) -> float:
+        if self.respect_retry_after and exc is not None:
+            wait = retry_after(exc)
+            if wait is not None:
+                return min(wait, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
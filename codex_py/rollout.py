@@ -0,0 +1,354 @@
+from __future__ import annotations
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import uuid
+import zlib
+from collections import deque
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from .chunks import StreamChunk
+
+# Rollouts are JSONL: a "session" header, then per turn the user "message",
+# the streamed "item"s and the assistant "message".  Compressed rollouts are
+# a concatenation of independent gzip members / zstd frames ("blocks"); every
+# turn starts a new block and <rollout>.idx maps turn -> block offset as
+# fixed-size little-endian (turn, offset) pairs.
+_IDX_ENTRY = struct.Struct("<QQ")
+READ_SIZE = 1 << 20
+
+
+def index_path(path: Path) -> Path:
+    return path.with_name(path.name + ".idx")
+
+
+def compression_for(path: Path) -> Optional[str]:
+    if path.name.endswith(".gz"):
+        return "gzip"
+    if path.name.endswith(".zst"):
+        return "zstd"
+    return None
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError("zstandard package required for .zst rollouts") from None
+    return zstandard
+
+
+def _compressor(compression: Optional[str]) -> Optional[Callable[[bytes], bytes]]:
+    if compression is None:
+        return None
+    if compression == "gzip":
+        return _gzip_member
+    if compression == "zstd":
+        return _zstd().ZstdCompressor().compress
+    raise ValueError(f"unknown compression: {compression!r}")
+
+
+def _gzip_member(data: bytes) -> bytes:
+    # one complete member per block; concatenated members are valid gzip
+    co = zlib.compressobj(6, zlib.DEFLATED, 31)
+    return co.compress(data) + co.flush()
+
+
+def _decompressor(compression: str) -> Any:
+    if compression == "gzip":
+        return zlib.decompressobj(31)
+    return _zstd().ZstdDecompressor().decompressobj()
+
+
+def iter_blocks(path: Path, offset: int = 0) -> Iterator[Tuple[int, bytes]]:
+    """Yield ``(end offset, data)`` for each complete block from *offset*.
+
+    Uncompressed files yield fixed-size reads; compressed files yield one
+    item per block, so memory stays bounded by the block size.  A truncated
+    trailing block is ignored.
+    """
+    compression = compression_for(path)
+    with open(path, "rb") as f:
+        f.seek(offset)
+        if compression is None:
+            while True:
+                data = f.read(READ_SIZE)
+                if not data:
+                    return
+                offset += len(data)
+                yield offset, data
+        d = _decompressor(compression)
+        parts: List[bytes] = []
+        while True:
+            data = f.read(READ_SIZE)
+            if not data:
+                return
+            while data:
+                parts.append(d.decompress(data))
+                if not d.eof:
+                    offset += len(data)
+                    break
+                rest = d.unused_data
+                offset += len(data) - len(rest)
+                yield offset, b"".join(parts)
+                parts = []
+                d = _decompressor(compression)
+                data = rest
+
+
+def read_index(path: Path) -> List[Tuple[int, int]]:
+    """``(turn, offset)`` pairs of a rollout, ignoring a torn trailing entry."""
+    try:
+        raw = index_path(path).read_bytes()
+    except OSError:
+        return []
+    usable = len(raw) - len(raw) % _IDX_ENTRY.size
+    return [entry for entry in _IDX_ENTRY.iter_unpack(raw[:usable])]
+
+
+def turn_offset(path: Path, turn: int) -> int:
+    """Byte offset where *turn* starts (0 if the rollout has no such turn)."""
+    for n, offset in read_index(path):
+        if n == turn:
+            return offset
+    return 0
+
+
+def iter_lines(path: Path, offset: int = 0) -> Iterator[bytes]:
+    """Yield the lines of a rollout (without newlines) starting at *offset*.
+
+    Uncompressed files are scanned through ``mmap`` so only the current
+    line is copied; compressed files are decoded block by block.
+    """
+    if compression_for(path) is None:
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if offset >= size:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                pos = offset
+                while pos < size:
+                    end = m.find(b"\n", pos)
+                    if end < 0:
+                        end = size
+                    yield m[pos:end]
+                    pos = end + 1
+        return
+    tail = b""
+    for _, data in iter_blocks(path, offset):
+        lines = (tail + data).split(b"\n")
+        tail = lines.pop()
+        yield from lines
+    if tail:
+        yield tail
+
+
+def tail_lines(path: Path, count: int) -> List[bytes]:
+    """The last *count* non-empty lines, without reading the whole file.
+
+    Uncompressed files are searched backwards through ``mmap``; compressed
+    ones are decoded from the last indexed turn, stepping back one turn at
+    a time until enough lines are found.
+    """
+    if count <= 0:
+        return []
+    if compression_for(path) is None:
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if not size:
+                return []
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                lines: List[bytes] = []
+                end = size
+                while end > 0 and len(lines) < count:
+                    start = m.rfind(b"\n", 0, end) + 1
+                    if m[start:end].strip():
+                        lines.append(m[start:end])
+                    end = start - 1
+                return lines[::-1]
+    starts = sorted({offset for _, offset in read_index(path)} | {0})
+    for offset in reversed(starts):
+        found: deque = deque(maxlen=count)
+        total = 0
+        for line in iter_lines(path, offset):
+            if line.strip():
+                found.append(line)
+                total += 1
+        if total >= count or offset == 0:
+            return list(found)
+    return []
+
+
+def iter_records(path: Path, turn: int | None = None) -> Iterator[Dict[str, Any]]:
+    """Decode the JSONL records of a rollout, optionally starting at *turn*.
+
+    Lines that do not decode (a record torn by a crash) are skipped.
+    """
+    offset = turn_offset(path, turn) if turn is not None else 0
+    for line in iter_lines(path, offset):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            continue
+
+
+def _jsonable(value: Any) -> Any:
+    dump = getattr(value, "model_dump", None)
+    if dump is not None:
+        return dump()
+    return repr(value)
+
+
+class RolloutRecorder:
+    """Append-only session log fed from ``AgentLoop``'s ``on_item`` stream.
+
+    Records are buffered and written as one block when ``block_size`` bytes
+    are pending or a turn ends; ``fsync`` runs at most every
+    ``fsync_interval`` seconds, and on close.  ``on_turn(path, turn)`` runs
+    once a turn is on disk, e.g. to index it for search.  With ``resume=True`` an
+    existing rollout is checked after a crash: a torn trailing block or line
+    and index entries pointing past it are truncated, and recording carries
+    on with the next turn.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        *,
+        session: Dict[str, Any] | None = None,
+        compression: str | None = "auto",
+        block_size: int = 64 * 1024,
+        fsync_interval: float = 1.0,
+        resume: bool = False,
+        on_close: Callable[[Path], None] | None = None,
+        on_turn: Callable[[Path, int], None] | None = None,
+    ) -> None:
+        self.path = Path(path)
+        self.compression = compression_for(self.path) if compression == "auto" else compression
+        self._compress = _compressor(self.compression)
+        self.block_size = block_size
+        self.fsync_interval = fsync_interval
+        self.on_close = on_close
+        self.on_turn = on_turn
+        self.turn = 0
+        self._lock = threading.Lock()
+        self._buffer: List[bytes] = []
+        self._buffered = 0
+        self._reply: List[str] = []
+        self._last_sync = time.monotonic()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if resume and self.path.exists():
+            self._recover()
+        elif self.path.exists():
+            raise FileExistsError(self.path)
+        self._file = open(self.path, "ab")
+        self._idx = open(index_path(self.path), "ab")
+        if self._file.tell() == 0:
+            header = {
+                "type": "session",
+                "id": uuid.uuid4().hex,
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+            }
+            header.update(session or {})
+            self._append(header)
+
+    def _recover(self) -> None:
+        entries = read_index(self.path)
+        size = self.path.stat().st_size
+        start = 0
+        for _, offset in entries:
+            if offset <= size:
+                start = max(start, offset)
+        end = start
+        if self.compression is None:
+            with open(self.path, "rb") as f:
+                f.seek(start)
+                data = f.read()
+            end = start + data.rfind(b"\n") + 1
+        else:
+            for end, _ in iter_blocks(self.path, start):
+                pass
+        with open(self.path, "r+b") as f:
+            f.truncate(end)
+        kept = [(n, offset) for n, offset in entries if offset < end]
+        index_path(self.path).write_bytes(b"".join(_IDX_ENTRY.pack(*e) for e in kept))
+        self.turn = kept[-1][0] if kept else 0
+
+    def _append(self, record: Dict[str, Any]) -> None:
+        line = json.dumps(record, default=_jsonable, separators=(",", ":")).encode("utf-8") + b"\n"
+        self._buffer.append(line)
+        self._buffered += len(line)
+        if self._buffered >= self.block_size:
+            self._flush_block()
+
+    def _flush_block(self, fsync: bool = False) -> None:
+        if self._buffer:
+            data = b"".join(self._buffer)
+            self._buffer = []
+            self._buffered = 0
+            self._file.write(self._compress(data) if self._compress else data)
+            self._file.flush()
+        self._idx.flush()
+        if fsync or time.monotonic() - self._last_sync >= self.fsync_interval:
+            os.fsync(self._file.fileno())
+            os.fsync(self._idx.fileno())
+            self._last_sync = time.monotonic()
+
+    def begin_turn(self, messages: List[Dict[str, Any]]) -> int:
+        """Start a new turn, recording the last user message of *messages*."""
+        with self._lock:
+            self._flush_block()
+            self.turn += 1
+            self._idx.write(_IDX_ENTRY.pack(self.turn, self._file.tell()))
+            self._reply = []
+            for message in reversed(messages):
+                if message.get("role") == "user":
+                    self._append({"type": "message", "turn": self.turn, "role": "user", "content": message.get("content")})
+                    break
+            return self.turn
+
+    def record(self, item: Any) -> None:
+        """``on_item`` hook: append one streamed item to the current turn."""
+        chunk = StreamChunk.from_raw(item)
+        with self._lock:
+            if chunk.content:
+                self._reply.append(chunk.content)
+            self._append({"type": "item", "turn": self.turn, "item": chunk.to_dict()})
+
+    def end_turn(self) -> None:
+        with self._lock:
+            self._append({"type": "message", "turn": self.turn, "role": "assistant", "content": "".join(self._reply)})
+            self._reply = []
+            self._flush_block()
+            turn = self.turn
+        if self.on_turn is not None:
+            self.on_turn(self.path, turn)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file.closed:
+                return
+            self._flush_block(fsync=True)
+            self._file.close()
+            self._idx.close()
+        if self.on_close is not None:
+            self.on_close(self.path)
+
+    def __enter__(self) -> "RolloutRecorder":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+def new_rollout_path(history_dir: Path, compression: str | None = None) -> Path:
+    stamp = datetime.now().strftime("%Y-%m-%dT%H-%M-%S")
+    suffix = {None: ".jsonl", "gzip": ".jsonl.gz", "zstd": ".jsonl.zst"}[compression]
+    return Path(history_dir) / f"rollout-{stamp}-{uuid.uuid4().hex[:8]}{suffix}"
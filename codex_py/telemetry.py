@@ -0,0 +1,198 @@
+from __future__ import annotations
+import json
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    """Fixed-bucket histogram; cheap enough to update per chunk."""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        i = 0
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                break
+        else:
+            i = len(self.buckets)
+        self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+    def merge(self, other: "Histogram") -> None:
+        for i, n in enumerate(other.counts):
+            self.counts[i] += n
+        self.sum += other.sum
+        self.count += other.count
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-th observation."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(self.buckets, self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"buckets": list(self.buckets), "counts": list(self.counts), "sum": self.sum, "count": self.count}
+
+
+def _usage(chunk: Any) -> Any:
+    if isinstance(chunk, dict):
+        return chunk.get("usage")
+    return getattr(chunk, "usage", None)
+
+
+@dataclass
+class RequestMetrics:
+    model: str
+    started_at: float = field(default_factory=time.time)
+    ttft: Optional[float] = None
+    duration: float = 0.0
+    chunks: int = 0
+    retries: int = 0
+    cached: bool = False
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    error: Optional[str] = None
+    inter_chunk: Histogram = field(default_factory=Histogram)
+    _start: float = field(default_factory=time.monotonic, repr=False)
+    _last: Optional[float] = field(default=None, repr=False)
+
+    def observe(self, chunk: Any) -> None:
+        now = time.monotonic()
+        if self._last is None:
+            self.ttft = now - self._start
+        else:
+            self.inter_chunk.observe(now - self._last)
+        self._last = now
+        self.chunks += 1
+        usage = _usage(chunk)
+        if usage:
+            get = usage.get if isinstance(usage, dict) else lambda k: getattr(usage, k, None)
+            self.prompt_tokens = get("prompt_tokens")
+            self.completion_tokens = get("completion_tokens")
+
+    def finish(self) -> None:
+        self.duration = time.monotonic() - self._start
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "model": self.model,
+            "started_at": self.started_at,
+            "ttft": self.ttft,
+            "duration": self.duration,
+            "chunks": self.chunks,
+            "retries": self.retries,
+            "cached": self.cached,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "error": self.error,
+            "inter_chunk": self.inter_chunk.to_dict(),
+        }
+
+
+class JsonlExporter:
+    """``on_metrics`` hook appending one JSON line per request to *path*."""
+
+    def __init__(self, path: Path | str) -> None:
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def __call__(self, metrics: RequestMetrics) -> None:
+        line = json.dumps(metrics.to_dict(), separators=(",", ":")) + "\n"
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a", encoding="utf-8") as f:
+                f.write(line)
+
+
+class _ModelStats:
+    def __init__(self) -> None:
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.ttft = Histogram()
+        self.duration = Histogram()
+        self.inter_chunk = Histogram()
+
+
+class PrometheusExporter:
+    """``on_metrics`` hook aggregating per-model series in Prometheus text format.
+
+    ``render()`` returns the exposition text; ``write(path)`` suits the
+    node_exporter textfile collector.
+    """
+
+    def __init__(self, prefix: str = "codex") -> None:
+        self.prefix = prefix
+        self._models: Dict[str, _ModelStats] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, metrics: RequestMetrics) -> None:
+        with self._lock:
+            stats = self._models.setdefault(metrics.model, _ModelStats())
+            stats.requests += 1
+            stats.errors += metrics.error is not None
+            stats.retries += metrics.retries
+            stats.prompt_tokens += metrics.prompt_tokens or 0
+            stats.completion_tokens += metrics.completion_tokens or 0
+            if metrics.ttft is not None:
+                stats.ttft.observe(metrics.ttft)
+            stats.duration.observe(metrics.duration)
+            stats.inter_chunk.merge(metrics.inter_chunk)
+
+    def _histogram(self, lines: List[str], name: str, label: str, hist: Histogram) -> None:
+        cumulative = 0
+        for bound, n in zip(hist.buckets, hist.counts):
+            cumulative += n
+            lines.append(f'{name}_bucket{{{label},le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{label},le="+Inf"}} {hist.count}')
+        lines.append(f"{name}_sum{{{label}}} {hist.sum}")
+        lines.append(f"{name}_count{{{label}}} {hist.count}")
+
+    def render(self) -> str:
+        p = self.prefix
+        lines: List[str] = []
+        with self._lock:
+            for kind, name in (
+                ("counter", "requests_total"),
+                ("counter", "errors_total"),
+                ("counter", "retries_total"),
+                ("counter", "prompt_tokens_total"),
+                ("counter", "completion_tokens_total"),
+            ):
+                lines.append(f"# TYPE {p}_{name} {kind}")
+                attr = name[: -len("_total")]
+                for model, stats in sorted(self._models.items()):
+                    lines.append(f'{p}_{name}{{model="{model}"}} {getattr(stats, attr)}')
+            for attr in ("ttft", "duration", "inter_chunk"):
+                name = f"{p}_{attr}_seconds"
+                lines.append(f"# TYPE {name} histogram")
+                for model, stats in sorted(self._models.items()):
+                    self._histogram(lines, name, f'model="{model}"', getattr(stats, attr))
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: Path | str) -> None:
+        path = Path(path)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        tmp.write_text(self.render(), "utf-8")
+        tmp.replace(path)
@@ -17,8 +17,336 @@ class DummyClient:
 
 def test_agent_basic(monkeypatch):
     import codex_py.agent_loop as ag
-    monkeypatch.setattr(ag, "openai", type("x", (), {"OpenAI": lambda api_key=None: DummyClient()}))
+    monkeypatch.setattr(ag, "openai", type("x", (), {"OpenAI": lambda api_key=None, **kw: DummyClient()}))
     items = []
     agent = AgentLoop("test", api_key="key", on_item=items.append)
     agent.run([{"role": "user", "content": "hi"}])
     assert items
+
+
+class DummyAsyncStream:
+    def __init__(self, parts):
+        self.parts = parts
+
+    def __aiter__(self):
+        return self._gen()
+
+    async def _gen(self):
+        for part in self.parts:
+            yield {"choices": [{"delta": {"content": part}}]}
+
+
+class DummyAsyncClient:
+    def __init__(self, parts):
+        self.chat = self
+        self.completions = self
+        self.parts = parts
+
+    async def create(self, model, messages, stream):
+        return DummyAsyncStream(self.parts)
+
+
+def test_agent_arun_concurrent_sessions(monkeypatch):
+    import asyncio
+    import codex_py.agent_loop as ag
+    monkeypatch.setattr(
+        ag,
+        "openai",
+        type("x", (), {"AsyncOpenAI": lambda api_key=None, **kw: DummyAsyncClient(["a", "b"])}),
+    )
+    results = [[] for _ in range(5)]
+    loading = []
+    agents = [
+        AgentLoop("test", api_key="key", on_item=items.append, on_loading=loading.append)
+        for items in results
+    ]
+
+    async def main():
+        await asyncio.gather(*(a.arun([{"role": "user", "content": "hi"}]) for a in agents))
+
+    asyncio.run(main())
+    assert all(len(items) == 2 for items in results)
+    assert loading.count(True) == 5 and loading.count(False) == 5
+
+
+def test_registry_reuses_connections_across_turns():
+    import http.server
+    import json
+    import threading
+    import pytest
+    pytest.importorskip("openai")
+    from codex_py.agent_loop import ClientRegistry
+
+    chunk = {
+        "id": "c1",
+        "object": "chat.completion.chunk",
+        "created": 0,
+        "model": "test",
+        "choices": [{"index": 0, "delta": {"content": "hi"}, "finish_reason": None}],
+    }
+    # no trailing [DONE] so every client version reads the body to EOF and
+    # hands the keep-alive connection back to its pool
+    body = f"data: {json.dumps(chunk)}\n\n".encode()
+    connections = []
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def setup(self):
+            connections.append(self.client_address)
+            super().setup()
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        registry = ClientRegistry()
+        base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+        items = []
+        for _ in range(5):
+            agent = AgentLoop("test", api_key="key", on_item=items.append, base_url=base_url, registry=registry)
+            agent.run([{"role": "user", "content": "hi"}])
+        assert len(items) == 5
+        assert len(connections) == 1
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+class FlakyClient:
+    """Streams ``parts`` but drops the connection after ``fail_after`` chunks once."""
+
+    def __init__(self, parts, fail_after):
+        self.chat = self
+        self.completions = self
+        self.parts = parts
+        self.fail_after = fail_after
+        self.requests = []
+
+    def create(self, model, messages, stream):
+        self.requests.append(messages)
+        fail = len(self.requests) == 1
+
+        def gen():
+            for i, part in enumerate(self.parts):
+                if fail and i == self.fail_after:
+                    raise ConnectionError("stream dropped")
+                yield {"choices": [{"delta": {"content": part}}]}
+
+        return gen()
+
+
+def test_agent_retry_does_not_repeat_delivered_output(monkeypatch):
+    import codex_py.agent_loop as ag
+    monkeypatch.setattr(ag.time, "sleep", lambda s: None)
+    client = FlakyClient(["Hel", "lo ", "wor", "ld"], fail_after=2)
+    items = []
+    agent = AgentLoop("test", api_key="key", on_item=items.append, client=client)
+    agent.run([{"role": "user", "content": "hi"}])
+    assert "".join(it["choices"][0]["delta"]["content"] for it in items) == "Hello world"
+    assert agent.retry_stats.attempts == 2
+    assert agent.retry_stats.bytes_wasted == len("Hello ")
+
+
+def test_agent_retry_continue_sends_partial_output(monkeypatch):
+    import codex_py.agent_loop as ag
+    monkeypatch.setattr(ag.time, "sleep", lambda s: None)
+    client = FlakyClient(["Hel", "lo"], fail_after=1)
+    agent = AgentLoop("test", api_key="key", client=client, resume="continue")
+    agent.run([{"role": "user", "content": "hi"}])
+    assert client.requests[1][-1] == {"role": "assistant", "content": "Hel"}
+    assert agent.retry_stats.bytes_wasted == 0
+
+
+class ScriptedClient:
+    """Answers the n-th request with ``responses[n]``; ``None`` drops the stream."""
+
+    def __init__(self, *responses):
+        self.chat = self
+        self.completions = self
+        self.responses = list(responses)
+        self.requests = []
+
+    def create(self, model, messages, stream):
+        self.requests.append(messages)
+        chunks = self.responses[len(self.requests) - 1]
+
+        def gen():
+            for chunk in chunks:
+                if chunk is None:
+                    raise ConnectionError("stream dropped")
+                yield chunk
+
+        return gen()
+
+
+def _text(part):
+    return {"choices": [{"delta": {"content": part}}]}
+
+
+def test_agent_dedupe_raises_when_retry_diverges(monkeypatch):
+    import pytest
+    import codex_py.agent_loop as ag
+    from codex_py.context import ConversationContext
+    monkeypatch.setattr(ag.time, "sleep", lambda s: None)
+    client = ScriptedClient([_text("Yes, "), None], [_text("No, "), _text("never")])
+    items = []
+    context = ConversationContext("test")
+    context.add("user", "hi")
+    with pytest.raises(ag.ResumeMismatch):
+        AgentLoop("test", api_key="key", on_item=items.append, client=client).run(context)
+    assert len(client.requests) == 2
+    assert "".join(it["choices"][0]["delta"]["content"] for it in items) == "Yes, "
+    assert [m["role"] for m in context.messages()] == ["user"]
+
+
+def test_agent_dedupe_switches_to_continue_with_prefill(monkeypatch):
+    import codex_py.agent_loop as ag
+    monkeypatch.setattr(ag.time, "sleep", lambda s: None)
+    client = ScriptedClient(
+        [_text("Yes, "), None],
+        [_text("No, "), _text("never")],
+        [_text("it is")],
+    )
+    items = []
+    agent = AgentLoop("test", api_key="key", on_item=items.append, client=client, prefill=True)
+    agent.run([{"role": "user", "content": "hi"}])
+    assert "".join(it["choices"][0]["delta"]["content"] for it in items) == "Yes, it is"
+    assert client.requests[2][-1] == {"role": "assistant", "content": "Yes, "}
+
+
+def test_agent_dedupe_keeps_chunks_without_text(monkeypatch):
+    import codex_py.agent_loop as ag
+    monkeypatch.setattr(ag.time, "sleep", lambda s: None)
+    role = {"choices": [{"delta": {"role": "assistant"}}]}
+    done = {"choices": [{"delta": {}, "finish_reason": "stop"}]}
+    client = ScriptedClient(
+        [role, _text("Hel"), None],
+        [role, _text("Hel"), _text("lo"), done],
+    )
+    items = []
+    AgentLoop("test", api_key="key", on_item=items.append, client=client).run([{"role": "user", "content": "hi"}])
+    assert "".join(it["choices"][0]["delta"].get("content") or "" for it in items) == "Hello"
+    assert items[-1] == done
+
+
+def test_agent_cache_replays_chunk_boundaries(tmp_path):
+    from codex_py.cache import ResponseCache
+
+    client = FlakyClient(["a", "bc", "d"], fail_after=None)
+    cache = ResponseCache(tmp_path)
+    first, second = [], []
+    AgentLoop("test", api_key="key", client=client, cache=cache, on_item=first.append).run(
+        [{"role": "user", "content": "hi"}]
+    )
+    AgentLoop("test", api_key="key", client=client, cache=cache, on_item=second.append).run(
+        [{"role": "user", "content": "hi"}]
+    )
+    assert len(client.requests) == 1
+    assert second == first
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    import os
+    import time
+    from codex_py.cache import ResponseCache
+
+    cache = ResponseCache(tmp_path, max_bytes=60)
+    for i, key in enumerate(["old", "new"]):
+        cache.put(key, [{"n": "x" * 20}])
+        os.utime(tmp_path / f"{key}.jsonl", (i, time.time()))
+    cache.put("newest", [{"n": "x" * 20}])
+    assert not (tmp_path / "old.jsonl").exists()
+    assert cache.get("new") is not None and cache.get("newest") is not None
+
+
+def test_cache_put_is_thread_safe_and_scans_rarely(tmp_path, monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+    from codex_py.cache import ResponseCache
+
+    cache = ResponseCache(tmp_path)
+    cache.put("same", [])
+    scans = []
+    evict = cache.evict
+    monkeypatch.setattr(cache, "evict", lambda: (scans.append(1), evict()))
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(lambda i: cache.put("same", [{"n": i}]), range(50)))
+    assert cache.get("same") is not None
+    assert [p.name for p in tmp_path.iterdir()] == ["same.jsonl"]
+    assert scans == []
+
+
+def test_agent_batches_chunks():
+    from codex_py.chunks import StreamChunk
+
+    client = FlakyClient(["a", "b", "c", "d", "e"], fail_after=None)
+    items = []
+    AgentLoop("test", api_key="key", client=client, on_item=items.append, batch_chunks=2).run(
+        [{"role": "user", "content": "hi"}]
+    )
+    assert all(isinstance(it, StreamChunk) for it in items)
+    assert [it.content for it in items] == ["ab", "cd", "e"]
+
+
+def test_batcher_counts_bytes_and_flushes_on_its_timer():
+    import threading
+    from codex_py.chunks import ChunkBatcher, thread_timer
+
+    flushed = []
+    batcher = ChunkBatcher(flushed.append, max_bytes=4)
+    batcher.add({"choices": [{"delta": {"content": "é"}}]})
+    assert flushed == []
+    batcher.add({"choices": [{"delta": {"content": "é"}}]})
+    assert [c.content for c in flushed] == ["éé"]
+
+    done = threading.Event()
+    batcher = ChunkBatcher(lambda c: (flushed.append(c), done.set()), interval=0.05, schedule=thread_timer)
+    batcher.add({"choices": [{"delta": {"content": "paused"}}]})
+    assert done.wait(5)
+    assert flushed[-1].content == "paused"
+    batcher.flush()
+    assert len(flushed) == 2
+
+
+def test_agent_reports_metrics(tmp_path):
+    import json
+    from codex_py.telemetry import JsonlExporter, PrometheusExporter
+
+    class UsageClient(FlakyClient):
+        def create(self, model, messages, stream, stream_options):
+            assert stream_options == {"include_usage": True}
+            yield from super().create(model, messages, stream)
+            yield {"choices": [], "usage": {"prompt_tokens": 3, "completion_tokens": 2}}
+
+    prom = PrometheusExporter()
+    jsonl = JsonlExporter(tmp_path / "metrics.jsonl")
+    events = []
+
+    def on_metrics(m):
+        events.append(m)
+        prom(m)
+        jsonl(m)
+
+    agent = AgentLoop(
+        "test", api_key="key", client=UsageClient(["a", "b"], fail_after=None),
+        on_metrics=on_metrics, include_usage=True,
+    )
+    agent.run([{"role": "user", "content": "hi"}])
+    (m,) = events
+    assert m.chunks == 3 and m.ttft is not None and m.inter_chunk.count == 2
+    assert (m.prompt_tokens, m.completion_tokens) == (3, 2)
+    assert json.loads((tmp_path / "metrics.jsonl").read_text())["completion_tokens"] == 2
+    text = prom.render()
+    assert 'codex_requests_total{model="test"} 1' in text
+    assert 'codex_ttft_seconds_count{model="test"} 1' in text
@@ -0,0 +1,81 @@
+from codex_py.approval_store import ApprovalStore, normalize_command
+from codex_py.approvals import approve_command, approve_commands
+
+
+def test_normalize_command_keeps_exact_argv(tmp_path):
+    assert normalize_command(["/usr/bin/make", "test"]) != normalize_command(["make", "test"])
+    assert normalize_command(["bash", "-lc", "echo '>/etc/x'"]) != normalize_command(["bash", "-lc", "echo >/etc/x"])
+    assert normalize_command(["bash", "-lc", "echo '$(id)'"]) != normalize_command(["bash", "-lc", 'echo "$(id)"'])
+    a, b = tmp_path / "a", tmp_path / "b"
+    assert normalize_command(["./deploy.sh"], a) != normalize_command(["./deploy.sh"], b)
+
+
+def test_store_remembers_decisions_by_scope(tmp_path):
+    root = tmp_path / "repo"
+    sub = root / "pkg"
+    sub.mkdir(parents=True)
+    db = tmp_path / "approvals.sqlite3"
+    store = ApprovalStore(root, db)
+    assert store.lookup(["make", "test"], root) is None
+    store.remember(["make", "test"], root, True)
+    store.remember(["rm", "-rf", "build"], sub, False)
+    assert store.lookup(["make", "test"], sub) is True
+    assert store.lookup(["/usr/bin/make", "test"], sub) is None
+    assert store.lookup(["rm", "-rf", "build"], sub) is False
+    assert store.lookup(["rm", "-rf", "build"], root) is None
+
+    # a second process sees decisions made after it opened the store
+    other = ApprovalStore(root, db)
+    store.remember(["make", "lint"], root, True)
+    assert other.lookup(["make", "lint"], sub) is True
+
+
+def test_store_expires_decisions(tmp_path):
+    store = ApprovalStore(tmp_path, tmp_path / "a.sqlite3")
+    store.remember(["make"], tmp_path, True, ttl=-1)
+    assert store.lookup(["make"], tmp_path) is None
+    assert store.prune() == 1
+
+
+def test_revocation_by_another_process_is_seen(tmp_path):
+    db = tmp_path / "approvals.sqlite3"
+    store = ApprovalStore(tmp_path, db)
+    other = ApprovalStore(tmp_path, db)
+    store.remember(["make", "deploy"], tmp_path, True)
+    assert other.lookup(["make", "deploy"], tmp_path) is True
+    store.remember(["make", "deploy"], tmp_path, False)
+    assert other.lookup(["make", "deploy"], tmp_path) is False
+
+
+def test_approve_command_consults_store_before_review(tmp_path):
+    store = ApprovalStore(tmp_path, tmp_path / "approvals.sqlite3")
+    asked = []
+
+    def review(command):
+        asked.append(command)
+        return command == ["make", "test"]
+
+    assert approve_command(["ls"], "suggest", tmp_path, store=store, review=review) is True
+    assert approve_command(["make", "test"], "suggest", tmp_path, store=store, review=review) is True
+    assert approve_command(["rm", "-rf", "x"], "suggest", tmp_path, store=store, review=review) is False
+    assert asked == [["make", "test"], ["rm", "-rf", "x"]]
+    # remembered decisions are served without asking again
+    assert approve_command(["make", "test"], "suggest", tmp_path, store=store, review=review) is True
+    assert approve_command(["rm", "-rf", "x"], "suggest", tmp_path, store=store, review=review) is False
+    assert len(asked) == 2
+
+
+def test_approve_commands_reviews_a_plan_once(tmp_path):
+    store = ApprovalStore(tmp_path, tmp_path / "approvals.sqlite3")
+    store.remember(["make", "lint"], tmp_path, False)
+    shown = []
+
+    def review(commands, groups):
+        shown.append(groups)
+        return [1]
+
+    plan = [["ls"], ["make", "test"], ["make", "lint"], ["rm", "-rf", "x"]]
+    assert approve_commands(plan, "suggest", tmp_path, store=store, review=review) == [True, True, False, False]
+    assert shown == [{"Running make": [1], "Running rm": [3]}]
+    assert approve_commands(plan, "suggest", tmp_path, store=store, review=review) == [True, True, False, False]
+    assert len(shown) == 1
@@ -0,0 +1,77 @@
+from codex_py.approvals import can_auto_approve, is_safe_command
+
+
+def test_safe_commands():
+    assert is_safe_command(["ls", "-la"]) == ("List directory", "Searching")
+    assert is_safe_command(["git", "status"]) == ("Git status", "Using git")
+    assert is_safe_command(["git", "push"]) is None
+    assert is_safe_command(["cargo", "check"]) == ("Cargo check", "Running command")
+    assert is_safe_command(["find", ".", "-name", "*.py"]) == ("Find files", "Searching")
+    assert is_safe_command(["find", ".", "-delete"]) is None
+    assert is_safe_command(["sed", "-n", "1,20p", "f"]) == ("Sed print subset", "Reading files")
+    assert is_safe_command(["sed", "-n", "1,20p;w out", "f"]) is None
+    assert is_safe_command(["rm", "-rf", "/"]) is None
+    assert is_safe_command([]) is None
+
+
+def test_can_auto_approve_policies_and_cache():
+    first = can_auto_approve(["cat", "README.md"], "suggest")
+    assert first.type == "auto-approve" and first.group == "Reading files"
+    assert can_auto_approve(["cat", "README.md"], "suggest") is first
+    assert can_auto_approve(["make"], "suggest").type == "ask-user"
+    full = can_auto_approve(["make"], "full-auto")
+    assert full.type == "auto-approve" and full.run_in_sandbox
+
+
+def test_shell_scripts_are_split_and_classified():
+    from codex_py.approvals import parse_shell_script
+
+    assert parse_shell_script("ls && cat foo | wc -l") == (("ls",), ("cat", "foo"), ("wc", "-l"))
+    assert parse_shell_script("(cd src; ls) || pwd") == (("cd", "src"), ("ls",), ("pwd",))
+    assert parse_shell_script("{ ls; } && (pwd)") == (("ls",), ("pwd",))
+    assert parse_shell_script("ls ( ) { touch pwned; }; ls") is None
+    assert can_auto_approve(["bash", "-lc", "ls && cat foo | wc -l"], "suggest").type == "auto-approve"
+    assert can_auto_approve(["bash", "-lc", "git status 2>&1 | head"], "suggest").type == "auto-approve"
+    assert can_auto_approve(["sh", "-c", "grep -r x . 2>/dev/null"], "suggest").type == "auto-approve"
+    assert can_auto_approve(["bash", "-c", "bash -lc 'pwd; ls'"], "suggest").type == "auto-approve"
+    for script in [
+        "ls && rm -rf /",
+        "cat foo > bar",
+        "echo hi >> ~/.bashrc",
+        "cat $(which python)",
+        "echo `id`",
+        "ls &",
+        "cat <<EOF",
+        "echo 'unterminated",
+        "ls\nrm -rf /",
+        "ls\r\nrm -rf /",
+        "echo a#b; rm -rf ~",
+        "ls #x; rm -rf ~",
+        "ls ( ) { touch pwned; }; ls",
+        "cat ( ) { touch pwned; }; cat foo",
+        "ls () { touch pwned; }; ls",
+        "ls(){ touch pwned; }; ls",
+        "{ ls; } touch pwned",
+    ]:
+        assert can_auto_approve(["bash", "-lc", script], "suggest").type == "ask-user", script
+
+
+def test_shell_newlines_and_hashes_do_not_hide_commands():
+    from codex_py.approvals import parse_shell_script
+
+    assert parse_shell_script("ls\nrm -rf /") is None
+    assert parse_shell_script("echo a#b; rm -rf ~") == (("echo", "a#b"), ("rm", "-rf", "~"))
+
+
+def test_can_auto_approve_many_groups_commands_for_review():
+    from codex_py.approvals import can_auto_approve_many, group_for_review
+
+    commands = [["ls"], ["make"], ["rm", "-rf", "build"], ["make", "test"], ["bash", "-lc", "ls > x"]]
+    assessments = can_auto_approve_many(commands, "suggest")
+    assert [a.type for a in assessments] == ["auto-approve"] + ["ask-user"] * 4
+    assert group_for_review(assessments) == {
+        "Running make": [1, 3],
+        "Running rm": [2],
+        "Running shell scripts": [4],
+    }
+    assert group_for_review(can_auto_approve_many(commands, "full-auto")) == {}
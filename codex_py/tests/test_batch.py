@@ -0,0 +1,60 @@
+import asyncio
+import io
+import json
+
+from codex_py.agent_loop import AgentLoop
+from codex_py.batch import read_batch, run_batch, write_jsonl
+
+
+class EchoClient:
+    """Replies with the prompt; later prompts finish first."""
+
+    def __init__(self):
+        self.chat = self
+        self.completions = self
+        self.in_flight = 0
+        self.peak = 0
+
+    async def create(self, model, messages, stream):
+        prompt = messages[-1]["content"]
+        if prompt == "boom":
+            raise RuntimeError("bad prompt")
+        return self._stream(prompt)
+
+    async def _stream(self, prompt):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        await asyncio.sleep(0.01 * (10 - int(prompt[-1])))
+        self.in_flight -= 1
+        yield {"choices": [{"delta": {"content": prompt.upper()}}]}
+
+
+def _run(lines, **kwargs):
+    client = EchoClient()
+    out = io.StringIO()
+    failures = asyncio.run(
+        run_batch(
+            read_batch(lines),
+            lambda item: AgentLoop("test", api_key="key", client=client, max_retries=0),
+            write_jsonl(out),
+            **kwargs,
+        )
+    )
+    return client, failures, [json.loads(line) for line in out.getvalue().splitlines()]
+
+
+def test_batch_ordered_with_error_isolation():
+    lines = [json.dumps(f"p{i}") for i in range(6)] + ['{"prompt": "boom", "id": "x"}', "not json"]
+    client, failures, results = _run(lines, concurrency=3)
+    assert [r["index"] for r in results] == list(range(8))
+    assert [r.get("output") for r in results[:6]] == [f"P{i}" for i in range(6)]
+    assert results[6]["id"] == "x" and "bad prompt" in results[6]["error"]
+    assert "invalid JSON" in results[7]["error"]
+    assert failures == 2
+    assert client.peak <= 3
+
+
+def test_batch_unordered_emits_as_completed():
+    lines = [json.dumps(f"p{i}") for i in range(4)]
+    _, _, results = _run(lines, concurrency=4, ordered=False)
+    assert [r["output"] for r in results] == ["P3", "P2", "P1", "P0"]
@@ -1,5 +1,6 @@
 import json
 import os
+import pytest
 from typer.testing import CliRunner
 
 from codex_py.cli import app
@@ -21,6 +22,29 @@ def test_view(tmp_path):
     assert "hello" in result.output
 
 
+@pytest.mark.parametrize("name", ["r.jsonl", "r.jsonl.gz"])
+def test_view_streams_rollout_records(tmp_path, name):
+    from codex_py.rollout import RolloutRecorder
+
+    path = tmp_path / name
+    with RolloutRecorder(path, block_size=32) as recorder:
+        for n in range(1, 4):
+            recorder.begin_turn([{"role": "user", "content": f"question {n}"}])
+            recorder.record({"choices": [{"delta": {"content": f"answer {n}"}}]})
+            recorder.end_turn()
+
+    result = runner.invoke(app, ["--view", str(path)])
+    assert result.exit_code == 0
+    assert '"type": "session"' in result.output and '"content": "answer 3"' in result.output
+
+    result = runner.invoke(app, ["--view", str(path), "--turn", "2"])
+    assert "question 2" in result.output and "answer 2" in result.output
+    assert "question 1" not in result.output and "question 3" not in result.output
+
+    result = runner.invoke(app, ["--view", str(path), "--tail", "1"])
+    assert result.output.count('"type"') == 1 and '"content": "answer 3"' in result.output
+
+
 def test_completion():
     result = runner.invoke(app, ["--completion", "bash"])
     assert result.exit_code == 0
@@ -39,3 +63,67 @@ def test_config_opens_editor(tmp_path, monkeypatch):
     assert called
     assert instr.exists()
 
+
+
+def test_batch(tmp_path, monkeypatch):
+    import codex_py.agent_loop as ag
+
+    class Client:
+        def __init__(self, **kwargs):
+            self.chat = self
+            self.completions = self
+
+        async def create(self, model, messages, stream):
+            async def gen():
+                yield {"choices": [{"delta": {"content": messages[-1]["content"][::-1]}}]}
+            return gen()
+
+    monkeypatch.setattr(ag, "openai", type("x", (), {"AsyncOpenAI": Client}))
+    monkeypatch.setenv("OPENAI_API_KEY", "key")
+    prompts = tmp_path / "prompts.jsonl"
+    prompts.write_text('"abc"\n{"id": "b", "prompt": "xyz"}\n')
+    result = runner.invoke(app, ["--batch", str(prompts), "--concurrency", "2"])
+    assert result.exit_code == 0
+    lines = [json.loads(line) for line in result.output.splitlines()]
+    assert [(r["id"], r["output"]) for r in lines] == [(0, "cba"), ("b", "zyx")]
+
+
+STARTUP_SCRIPT = """
+import sys, time
+start = time.perf_counter()
+from codex_py.cli import app
+try:
+    app(["--completion", "bash"])
+except SystemExit:
+    pass
+elapsed = time.perf_counter() - start
+heavy = [m for m in ("openai", "textual", "http.server", "webbrowser", "codex_py.agent_loop") if m in sys.modules]
+print(f"{elapsed}|{','.join(heavy)}", file=sys.stderr)
+"""
+
+
+def test_completion_cold_start_budget():
+    import pathlib
+    import sys
+    budget = float(os.environ.get("CODEX_STARTUP_BUDGET", "1.0"))
+    root = pathlib.Path(__file__).resolve().parents[2]
+    proc = subprocess.run(
+        [sys.executable, "-c", STARTUP_SCRIPT], cwd=root, capture_output=True, text=True, check=True
+    )
+    elapsed, heavy = proc.stderr.strip().splitlines()[-1].split("|")
+    assert "bash completion for codex" in proc.stdout
+    assert heavy == ""
+    assert float(elapsed) < budget
+
+
+def test_history_search(tmp_path, monkeypatch):
+    from codex_py.rollout import RolloutRecorder
+
+    monkeypatch.setenv("HOME", str(tmp_path))
+    with RolloutRecorder(tmp_path / ".codex" / "history" / "rollout-a.jsonl") as recorder:
+        recorder.begin_turn([{"role": "user", "content": "rename the widget factory"}])
+        recorder.end_turn()
+    result = runner.invoke(app, ["--history", "--search", "widget"])
+    assert result.exit_code == 0
+    assert "rollout-a.jsonl  turn 1  rename the [widget] factory" in result.output
+    assert runner.invoke(app, ["--history", "--search", "gadget"]).exit_code == 1
@@ -0,0 +1,126 @@
+import json
+import os
+import time
+
+import pytest
+
+import codex_py.config as cfg
+
+
+def test_load_config_is_cached_until_files_change(tmp_path, monkeypatch):
+    config_path = tmp_path / "config.json"
+    instructions_path = tmp_path / "instructions.md"
+    config_path.write_text(json.dumps({"model": "a", "history": {"saveHistory": True}}), "utf-8")
+    instructions_path.write_text("hi", "utf-8")
+    cfg.clear_config_cache()
+
+    reads = []
+    real = cfg._read_config
+    monkeypatch.setattr(cfg, "_read_config", lambda *a: reads.append(a) or real(*a))
+
+    first = cfg.load_config(config_path, instructions_path)
+    first["model"] = "mutated"
+    first["history"]["saveHistory"] = False
+    again = cfg.load_config(config_path, instructions_path)
+    assert again["model"] == "a"
+    assert again["history"]["saveHistory"] is True
+    assert isinstance(again, cfg.AppConfig)
+    assert len(reads) == 1
+
+    config_path.write_text(json.dumps({"model": "bb"}), "utf-8")
+    st = config_path.stat()
+    os.utime(config_path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    assert cfg.load_config(config_path, instructions_path)["model"] == "bb"
+    assert len(reads) == 2
+
+
+def test_load_config_without_bootstrap_writes_nothing(tmp_path):
+    config_path = tmp_path / "sub" / "config.json"
+    instructions_path = tmp_path / "sub" / "instructions.md"
+    conf = cfg.load_config(config_path, instructions_path, bootstrap=False)
+    assert conf["model"] == cfg.DEFAULT_AGENTIC_MODEL
+    assert not (tmp_path / "sub").exists()
+
+    cfg.load_config(config_path, instructions_path)
+    assert config_path.exists() and instructions_path.exists()
+
+
+def test_project_files_layer_over_global(tmp_path):
+    home = tmp_path / "home"
+    home.mkdir()
+    (home / "config.json").write_text(json.dumps({"model": "global", "provider": "openai"}), "utf-8")
+    (home / "instructions.md").write_text("global rules", "utf-8")
+    repo = tmp_path / "repo"
+    pkg = repo / "pkg" / "sub"
+    pkg.mkdir(parents=True)
+    (repo / ".git").mkdir()
+    (repo / "AGENTS.md").write_text("repo rules", "utf-8")
+    (repo / "codex.json").write_text(json.dumps({"model": "repo"}), "utf-8")
+    (repo / "pkg" / "codex.json").write_text(json.dumps({"model": "pkg"}), "utf-8")
+    (tmp_path / "AGENTS.md").write_text("outside the repo", "utf-8")
+    cfg.clear_config_cache()
+
+    conf = cfg.load_config(home / "config.json", home / "instructions.md", project_dir=pkg)
+    assert conf["model"] == "pkg"
+    assert conf["provider"] == "openai"
+    assert conf["instructions"] == "global rules\n\nrepo rules"
+
+    (repo / "AGENTS.md").write_text("repo rules, revised", "utf-8")
+    conf = cfg.load_config(home / "config.json", home / "instructions.md", project_dir=pkg)
+    assert conf["instructions"].endswith("repo rules, revised")
+
+    time.sleep(0.05)  # let the directory mtime tick over
+    (pkg / "AGENTS.md").write_text("sub rules", "utf-8")
+    conf = cfg.load_config(home / "config.json", home / "instructions.md", project_dir=pkg)
+    assert conf["instructions"].endswith("repo rules, revised\n\nsub rules")
+
+
+def test_new_project_files_in_ancestors_are_found(tmp_path):
+    repo = tmp_path / "repo"
+    sub = repo / "sub"
+    sub.mkdir(parents=True)
+    (repo / ".git").mkdir()
+    cfg.clear_config_cache()
+    assert cfg.discover_project_files(sub) == ()
+
+    time.sleep(0.05)  # let the directory mtime tick over
+    (repo / "AGENTS.md").write_text("repo rules", "utf-8")
+    assert cfg.discover_project_files(sub) == (repo.resolve() / "AGENTS.md",)
+    conf = cfg.load_config(tmp_path / "config.json", tmp_path / "instructions.md", project_dir=sub)
+    assert conf["instructions"] == "repo rules"
+
+
+def test_invalid_config_raises_and_is_not_reparsed(tmp_path, monkeypatch):
+    config_path = tmp_path / "config.json"
+    instructions_path = tmp_path / "instructions.md"
+    config_path.write_text("{not json", "utf-8")
+    cfg.clear_config_cache()
+
+    loads = []
+    real = cfg._load_stored
+    monkeypatch.setattr(cfg, "_load_stored", lambda p: loads.append(p) or real(p))
+    for _ in range(3):
+        with pytest.raises(cfg.ConfigError, match="invalid JSON"):
+            cfg.load_config(config_path, instructions_path)
+    assert loads == [config_path]
+
+
+@pytest.mark.parametrize(
+    "name, text, message",
+    [
+        ("config.json", '["model"]', "expected a mapping"),
+        ("config.json", '{"model": 4}', "'model' must be str"),
+        ("config.yaml", "model: [a, b]\n", "'model' must be str"),
+        ("config.yaml", "model: : :\n", "invalid YAML"),
+    ],
+)
+def test_schema_validation(tmp_path, name, text, message):
+    (tmp_path / name).write_text(text, "utf-8")
+    with pytest.raises(cfg.ConfigError, match=message):
+        cfg.load_config(tmp_path / name, tmp_path / "instructions.md", bootstrap=False)
+
+
+def test_yaml_config(tmp_path):
+    (tmp_path / "config.yml").write_text("model: o3\nprovider: openai\n", "utf-8")
+    conf = cfg.load_config(tmp_path / "config.yml", tmp_path / "instructions.md", bootstrap=False)
+    assert (conf["model"], conf["provider"]) == ("o3", "openai")
@@ -0,0 +1,67 @@
+from codex_py.agent_loop import AgentLoop
+from codex_py.context import ConversationContext
+
+
+def test_context_drops_oldest_turns_within_budget():
+    calls = []
+
+    def count(text):
+        calls.append(text)
+        return len(text)
+
+    ctx = ConversationContext("test", instructions="sys", budget=60)
+    ctx.count_tokens = count
+    for i in range(5):
+        ctx.add("user", f"question {i}")
+        ctx.add("assistant", f"answer {i}")
+    msgs = ctx.messages()
+    assert msgs[0] == {"role": "system", "content": "sys"}
+    assert msgs[1] == {"role": "user", "content": "question 3"}
+    assert msgs[-1] == {"role": "assistant", "content": "answer 4"}
+    assert ctx.tokens <= 60
+    # each message is tokenized exactly once
+    assert len(calls) == 10
+
+
+def test_context_summarizes_dropped_turns():
+    ctx = ConversationContext("test", budget=30, summarizer=lambda msgs: f"{len(msgs)} messages")
+    for i in range(4):
+        ctx.add("user", "x" * 40)
+    # the previous summary plus the turn dropped last
+    assert ctx.messages()[0]["content"].endswith("2 messages")
+    assert len(ctx.messages()) == 2
+    assert ctx.tokens <= 30
+
+
+def test_context_summary_is_kept_within_budget():
+    ctx = ConversationContext("test", budget=40, summarizer=lambda msgs: "y" * 400)
+    for i in range(4):
+        ctx.add("user", "x" * 40)
+    assert ctx.tokens <= 40
+    summary, last = ctx.messages()
+    assert summary["content"].startswith("Summary of earlier conversation:")
+    assert last == {"role": "user", "content": "x" * 40}
+
+    ctx = ConversationContext("test", budget=20, summarizer=lambda msgs: "y" * 400)
+    for i in range(3):
+        ctx.add("user", "x" * 60)
+    assert ctx.tokens <= 20 and len(ctx.messages()) == 1
+
+
+def test_agent_appends_reply_to_context():
+    class Client:
+        def __init__(self):
+            self.chat = self
+            self.completions = self
+            self.sent = []
+
+        def create(self, model, messages, stream):
+            self.sent.append(list(messages))
+            return iter([{"choices": [{"delta": {"content": "hel"}}]}, {"choices": [{"delta": {"content": "lo"}}]}])
+
+    client = Client()
+    ctx = ConversationContext("test", instructions="be brief")
+    ctx.add("user", "hi")
+    AgentLoop("test", api_key="key", client=client).run(ctx)
+    assert client.sent[0][0] == {"role": "system", "content": "be brief"}
+    assert ctx.messages()[-1] == {"role": "assistant", "content": "hello"}
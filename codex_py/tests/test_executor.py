@@ -0,0 +1,85 @@
+import shutil
+import sys
+import threading
+import time
+
+import pytest
+
+from codex_py import executor
+from codex_py.approvals import SafetyAssessment
+from codex_py.executor import CommandExecutor, ExecResult, run_command
+
+
+def test_run_command_streams_output(tmp_path):
+    seen = []
+    result = run_command(["echo", "hello"], cwd=tmp_path, on_output=lambda s, t: seen.append((s, t)))
+    assert result.exit_code == 0 and result.stdout == "hello\n"
+    assert seen == [("stdout", "hello\n")]
+
+
+def test_run_command_limits_time_and_output():
+    result = run_command([sys.executable, "-c", "import time; time.sleep(5)"], timeout=0.2)
+    assert result.timed_out and result.exit_code is None and result.duration < 3
+    result = run_command([sys.executable, "-c", "print('x' * 10000)"], max_output=100)
+    assert result.truncated and len(result.stdout) == 100
+
+
+def test_run_command_missing_program():
+    assert run_command(["definitely-not-a-command"]).exit_code == 127
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux") or not shutil.which("bwrap"), reason="no sandbox helper")
+def test_sandboxed_command_has_no_network(tmp_path):
+    result = run_command(["cat", "/proc/net/dev"], cwd=tmp_path, sandbox=True)
+    if result.exit_code != 0:
+        pytest.skip(f"sandbox unavailable here: {result.stderr}")
+    assert result.sandboxed
+    interfaces = {line.split(":")[0].strip() for line in result.stdout.splitlines()[2:]}
+    assert interfaces == {"lo"}
+
+
+def test_sandbox_refuses_without_bubblewrap(monkeypatch, tmp_path):
+    monkeypatch.setattr(executor.sys, "platform", "linux")
+    monkeypatch.setattr(executor.shutil, "which", lambda name: "/usr/bin/unshare" if name == "unshare" else None)
+    with pytest.raises(RuntimeError, match="bubblewrap"):
+        run_command(["true"], cwd=tmp_path, sandbox=True)
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="needs a POSIX shell")
+def test_run_command_does_not_wait_for_background_children(monkeypatch):
+    monkeypatch.setattr(executor, "DRAIN_TIMEOUT", 0.2)
+    start = time.monotonic()
+    result = run_command(["sh", "-c", "echo started; sleep 30 &"])
+    assert result.exit_code == 0 and result.stdout == "started\n"
+    assert time.monotonic() - start < 5
+
+
+def test_execute_many_overlaps_read_only_commands(monkeypatch):
+    active = []
+    peak = [0]
+    lock = threading.Lock()
+    order = []
+
+    def fake_run(command, **kwargs):
+        with lock:
+            active.append(command)
+            peak[0] = max(peak[0], len(active))
+        time.sleep(0.05)
+        with lock:
+            active.remove(command)
+            order.append(command[0])
+        return ExecResult(list(command), 0, "", "", 0.05)
+
+    monkeypatch.setattr(executor, "run_command", fake_run)
+    commands = [["ls"], ["cat", "a"], ["rg", "x"], ["make"], ["wc", "a"]]
+    results = CommandExecutor(max_workers=4).execute_many(commands)
+    assert [r.command for r in results] == commands
+    assert peak[0] == 3
+    assert order.index("make") == 3
+
+
+def test_execute_honours_run_in_sandbox(monkeypatch):
+    calls = []
+    monkeypatch.setattr(executor, "run_command", lambda command, **kw: calls.append(kw["sandbox"]))
+    CommandExecutor().execute(["make"], SafetyAssessment("auto-approve", run_in_sandbox=True))
+    assert calls == [True]
@@ -0,0 +1,100 @@
+import asyncio
+import json
+import os
+
+from codex_py.history import HistoryIndex
+
+
+def write_rollout(directory, n, prompt=None, mtime=None):
+    path = directory / f"rollout-{n:05d}.json"
+    doc = {
+        "session": {"timestamp": f"2025-01-01T00:{n // 60 % 60:02d}:{n % 60:02d}Z", "model": "o3"},
+        "items": [
+            {"role": "system", "content": "rules"},
+            {"role": "user", "content": [{"type": "input_text", "text": prompt or f"prompt {n}"}]},
+        ],
+    }
+    path.write_text(json.dumps(doc))
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_index_refresh_is_incremental(tmp_path):
+    for n in range(5):
+        write_rollout(tmp_path, n)
+    (tmp_path / "notes.txt").write_text("not a rollout")
+    index = HistoryIndex(tmp_path)
+    assert index.refresh() == 5
+    assert index.refresh() == 0
+
+    write_rollout(tmp_path, 2, prompt="changed  prompt\nwith newline", mtime=1)
+    (tmp_path / "rollout-00004.json").unlink()
+    assert index.refresh() == 2
+    entries = index.entries(0, 10)
+    assert [e.name for e in entries] == [f"rollout-{n:05d}.json" for n in (3, 2, 1, 0)]
+    assert entries[1].first_prompt == "changed prompt with newline"
+    assert entries[0].model == "o3"
+
+    index.record(write_rollout(tmp_path, 9))
+    assert index.count() == 5
+    index.close()
+
+
+def test_history_app_pages_lazily(tmp_path):
+    from codex_py.tui import HistoryApp
+
+    for n in range(1000):
+        write_rollout(tmp_path, n)
+    app = HistoryApp(tmp_path)
+    app.list.page_size = 50
+
+    async def drive():
+        async with app.run_test(size=(80, 20)) as pilot:
+            await pilot.press("down", "down", "pagedown")
+            await pilot.pause()
+            assert len(app.list._pages) <= 2
+            await pilot.press("end", "enter")
+
+    asyncio.run(drive())
+    assert app.return_value == tmp_path / "rollout-00000.json"
+
+
+def test_search_indexes_turns_incrementally(tmp_path):
+    from codex_py.rollout import RolloutRecorder
+
+    write_rollout(tmp_path, 1, prompt="how do I configure the sandbox?")
+    index = HistoryIndex(tmp_path)
+    index.refresh()
+    path = tmp_path / "rollout-live.jsonl.gz"
+    with RolloutRecorder(path, on_turn=index.record_turn) as recorder:
+        recorder.begin_turn([{"role": "user", "content": "explain the retry policy"}])
+        recorder.record({"choices": [{"delta": {"content": "Retries back off exponentially with jitter."}}]})
+        recorder.end_turn()
+        assert [(h.name, h.turn) for h in index.search("jitter")] == [(path.name, 1)]
+        recorder.begin_turn([{"role": "user", "content": "and the sandbox?"}])
+        recorder.end_turn()
+
+    hits = index.search("sandbox")
+    assert {(h.name, h.turn) for h in hits} == {("rollout-00001.json", 0), (path.name, 2)}
+    assert any("[sandbox]" in h.snippet for h in hits)
+    assert index.search('retry-policy "OR') == []
+    assert index.refresh() == 0
+    assert index.count() == 2
+
+
+def test_search_falls_back_to_like_without_fts5(tmp_path, monkeypatch):
+    import codex_py.history as history
+
+    write_rollout(tmp_path, 1, prompt="how do I configure the sandbox? 100% sure")
+    write_rollout(tmp_path, 2, prompt="explain the retry policy")
+    HistoryIndex(tmp_path).refresh()
+    monkeypatch.setattr(history, "_FTS_SCHEMA", "CREATE VIRTUAL TABLE rollout_text USING no_such_module(content)")
+    index = HistoryIndex(tmp_path)
+    assert not index.full_text
+    assert index.refresh() == 2
+    hits = index.search("SANDBOX configure")
+    assert [(h.name, h.turn) for h in hits] == [("rollout-00001.json", 0)]
+    assert "[sandbox?]" in hits[0].snippet
+    assert [h.name for h in index.search("100%")] == ["rollout-00001.json"]
+    assert index.search("1_0") == []
@@ -0,0 +1,86 @@
+import io
+import threading
+import time
+
+from codex_py.output import TerminalWriter
+
+
+class SlowStream(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+        self.writes = 0
+
+    def write(self, s):
+        self.release.wait()
+        self.writes += 1
+        return super().write(s)
+
+
+def test_writer_never_blocks_on_slow_sink():
+    sink = SlowStream()
+    writer = TerminalWriter(sink, maxsize=2)
+    for i in range(1000):
+        writer.write(f"{i},")
+    sink.release.set()
+    writer.close()
+    assert sink.getvalue() == "".join(f"{i}," for i in range(1000))
+    assert sink.writes < 1000
+
+
+def test_writer_stops_on_broken_pipe():
+    class Broken(io.StringIO):
+        def write(self, s):
+            raise BrokenPipeError()
+
+    writer = TerminalWriter(Broken())
+    writer.write("x\n")
+    writer.close()
+    assert isinstance(writer.error, BrokenPipeError)
+    writer.write("ignored")
+
+
+def test_writer_flushes_overflow_without_another_write():
+    sink = SlowStream()
+    writer = TerminalWriter(sink, maxsize=1)
+    for i in range(100):
+        writer.write(f"{i},")
+    sink.release.set()
+    deadline = time.monotonic() + 5
+    while sink.getvalue() != "".join(f"{i}," for i in range(100)) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert sink.getvalue() == "".join(f"{i}," for i in range(100))
+    writer.close()
+
+
+def test_writer_blocks_once_overflow_limit_is_reached():
+    sink = SlowStream()
+    writer = TerminalWriter(sink, maxsize=1, max_overflow=10)
+    done = threading.Event()
+    writer.write("x")
+    time.sleep(0.1)  # the writer is now stuck in the sink
+
+    def produce():
+        for _ in range(10):
+            writer.write("x" * 10)
+        done.set()
+
+    threading.Thread(target=produce, daemon=True).start()
+    assert not done.wait(0.2)
+    sink.release.set()
+    assert done.wait(5)
+    writer.close()
+    assert sink.getvalue() == "x" * 101
+
+
+def test_close_does_not_hang_when_writer_died():
+    class Broken(io.StringIO):
+        def write(self, s):
+            raise BrokenPipeError()
+
+    writer = TerminalWriter(Broken(), maxsize=1)
+    writer.write("x\n")
+    writer._thread.join(5)
+    writer._queue.put_nowait("stuck")
+    writer.close()
+    assert isinstance(writer.error, BrokenPipeError)
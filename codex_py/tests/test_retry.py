@@ -0,0 +1,105 @@
+import pytest
+
+from codex_py.agent_loop import AgentLoop
+from codex_py.ratelimit import RateLimiter, TokenBucket
+from codex_py.retry import RetryPolicy
+
+
+class StatusError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = type("R", (), {"status_code": status_code, "headers": headers or {}})()
+
+
+def test_policy_classifies_errors():
+    policy = RetryPolicy()
+    assert policy.is_retryable(StatusError(429))
+    assert policy.is_retryable(StatusError(503))
+    assert policy.is_retryable(ConnectionError())
+    assert not policy.is_retryable(StatusError(400))
+    assert not policy.is_retryable(ValueError())
+
+
+def test_policy_delay_honours_retry_after_and_jitter():
+    policy = RetryPolicy(base_delay=1.0, max_delay=4.0)
+    assert policy.delay(1, StatusError(429, {"retry-after": "3"})) == 3.0
+    assert policy.delay(1, StatusError(429, {"retry-after": "7"})) == 4.0
+    assert policy.delay(1, StatusError(429, {"retry-after-ms": "250"})) == 0.25
+    assert all(0 <= policy.delay(10) <= 4.0 for _ in range(100))
+
+
+def test_policy_gives_up_when_retry_after_exceeds_cap():
+    policy = RetryPolicy(max_delay=4.0)
+    assert policy.should_retry(1, StatusError(429, {"retry-after": "3"}))
+    assert not policy.should_retry(1, StatusError(429, {"retry-after": "86400"}))
+    assert RetryPolicy(max_delay=4.0, respect_retry_after=False).should_retry(1, StatusError(429, {"retry-after": "86400"}))
+
+
+def test_agent_does_not_retry_client_errors():
+    calls = []
+
+    class Client:
+        def __init__(self):
+            self.chat = self
+            self.completions = self
+
+        def create(self, **kwargs):
+            calls.append(kwargs)
+            raise StatusError(400)
+
+    agent = AgentLoop("test", api_key="key", client=Client(), rate_limiter=RateLimiter())
+    with pytest.raises(StatusError):
+        agent.run([{"role": "user", "content": "hi"}])
+    assert len(calls) == 1
+
+
+def test_registry_clients_leave_retries_to_the_policy(monkeypatch):
+    import http.server
+    import threading
+    import codex_py.agent_loop as ag
+
+    pytest.importorskip("openai")
+    monkeypatch.setattr(ag.time, "sleep", lambda s: None)
+    requests = []
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            requests.append(self.path)
+            body = b'{"error": {"message": "slow down"}}'
+            self.send_response(429)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        registry = ag.ClientRegistry()
+        base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+        assert registry.get("key", base_url).max_retries == 0
+        agent = AgentLoop(
+            "test", api_key="key", base_url=base_url, registry=registry,
+            retry_policy=RetryPolicy(max_retries=2), rate_limiter=RateLimiter(),
+        )
+        with pytest.raises(Exception):
+            agent.run([{"role": "user", "content": "hi"}])
+        assert len(requests) == 3
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_token_bucket_reports_wait_once_empty():
+    bucket = TokenBucket(per_minute=60, capacity=2)
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == pytest.approx(1.0, abs=0.05)
+    limiter = RateLimiter(requests_per_minute=600, tokens_per_minute=60)
+    assert limiter.reserve(tokens=60) == 0
+    assert limiter.reserve(tokens=30) == pytest.approx(30.0, abs=0.1)
@@ -0,0 +1,68 @@
+import pytest
+
+from codex_py.agent_loop import AgentLoop
+from codex_py.context import ConversationContext
+from codex_py.history import rollout_metadata
+from codex_py.rollout import RolloutRecorder, iter_records, read_index
+
+
+class Client:
+    def __init__(self):
+        self.chat = self
+        self.completions = self
+
+    def create(self, model, messages, stream):
+        return iter([{"choices": [{"delta": {"content": part}}]} for part in ("he", "llo")])
+
+
+def record_turns(recorder, turns):
+    for n in range(turns):
+        recorder.begin_turn([{"role": "user", "content": f"question {n + 1}"}])
+        recorder.record({"choices": [{"delta": {"content": f"answer {n + 1}"}}]})
+        recorder.end_turn()
+
+
+@pytest.mark.parametrize("name", ["r.jsonl", "r.jsonl.gz"])
+def test_records_and_seeks_to_turn(tmp_path, name):
+    path = tmp_path / name
+    with RolloutRecorder(path, session={"model": "o3"}, block_size=64) as recorder:
+        record_turns(recorder, 5)
+    records = list(iter_records(path))
+    assert records[0]["type"] == "session" and records[0]["model"] == "o3"
+    assert [r["content"] for r in records if r["type"] == "message"][:2] == ["question 1", "answer 1"]
+    assert [turn for turn, _ in read_index(path)] == [1, 2, 3, 4, 5]
+    assert next(iter_records(path, turn=4)) == {"type": "message", "turn": 4, "role": "user", "content": "question 4"}
+    _, model, prompt = rollout_metadata(path)
+    assert (model, prompt) == ("o3", "question 1")
+
+
+@pytest.mark.parametrize("name", ["r.jsonl", "r.jsonl.gz"])
+def test_resume_truncates_torn_tail(tmp_path, name):
+    path = tmp_path / name
+    with RolloutRecorder(path) as recorder:
+        record_turns(recorder, 3)
+    good_size = path.stat().st_size
+    with open(path, "ab") as f:
+        f.write(b"\x1f\x8b\x08\x00garbage" if name.endswith(".gz") else b'{"type": "item", "tu')
+
+    with RolloutRecorder(path, resume=True) as recorder:
+        assert recorder.turn == 3
+        assert path.stat().st_size == good_size
+        record_turns(recorder, 1)
+    assert [r["turn"] for r in iter_records(path) if r["type"] == "message"] == [1, 1, 2, 2, 3, 3, 4, 4]
+
+
+def test_agent_loop_records_turns(tmp_path):
+    path = tmp_path / "r.jsonl"
+    items = []
+    recorder = RolloutRecorder(path)
+    agent = AgentLoop("m", api_key="key", client=Client(), on_item=items.append, recorder=recorder, batch_chunks=8)
+    context = ConversationContext("m")
+    context.add("user", "hi")
+    agent.run(context)
+    context.add("user", "again")
+    agent.run(context)
+    recorder.close()
+    messages = [(r["turn"], r["role"], r["content"]) for r in iter_records(path) if r["type"] == "message"]
+    assert messages == [(1, "user", "hi"), (1, "assistant", "hello"), (2, "user", "again"), (2, "assistant", "hello")]
+    assert len(items) == 2
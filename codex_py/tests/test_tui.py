@@ -0,0 +1,20 @@
+import asyncio
+
+from codex_py.tui import BatchReviewApp
+
+
+def _review(keys):
+    app = BatchReviewApp([["rm", "a"], ["rm", "b"], ["mv", "c", "d"]], {"rm": [0, 1], "mv": [2]})
+
+    async def drive():
+        async with app.run_test() as pilot:
+            await pilot.press(*keys)
+        return app.return_value
+
+    return asyncio.run(drive())
+
+
+def test_batch_review_approval_is_opt_in():
+    assert _review(["enter"]) == []
+    assert _review(["2", "enter"]) == [2]
+    assert _review(["y"]) == [0, 1, 2]
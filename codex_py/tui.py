@@ -1,8 +1,18 @@
 from __future__ import annotations
 import json
+import time
+from collections import OrderedDict
 from pathlib import Path
+from typing import Dict, List
+
+from .history import HistoryEntry, HistoryIndex
 try:
+    from rich.segment import Segment
+    from rich.style import Style
     from textual.app import App, ComposeResult
+    from textual.geometry import Size
+    from textual.scroll_view import ScrollView
+    from textual.strip import Strip
     from textual.widgets import Static
     TEXTUAL_AVAILABLE = True
 except ModuleNotFoundError:  # pragma: no cover - optional dependency
@@ -18,23 +28,100 @@ except ModuleNotFoundError:  # pragma: no cover - optional dependency
 
 
 if TEXTUAL_AVAILABLE:
-    class HistoryApp(App[str]):
-        def __init__(self, history_dir: Path) -> None:
+    class HistoryList(ScrollView, can_focus=True):
+        """Virtualized list over a ``HistoryIndex``.
+
+        Only the visible rows are rendered; entries are fetched from the index
+        a page at a time and at most ``max_pages`` pages are kept in memory.
+        """
+
+        def __init__(self, index: HistoryIndex, page_size: int = 200, max_pages: int = 8) -> None:
+            super().__init__()
+            self.index = index
+            self.page_size = page_size
+            self.max_pages = max_pages
+            self.cursor = 0
+            self.count = index.count()
+            self._pages: "OrderedDict[int, List[HistoryEntry]]" = OrderedDict()
+
+        def on_mount(self) -> None:
+            self.virtual_size = Size(self.size.width, self.count)
+            super().on_mount()
+
+        def entry(self, row: int) -> HistoryEntry | None:
+            page_no, offset = divmod(row, self.page_size)
+            page = self._pages.get(page_no)
+            if page is None:
+                page = self.index.entries(page_no * self.page_size, self.page_size)
+                self._pages[page_no] = page
+                while len(self._pages) > self.max_pages:
+                    self._pages.popitem(last=False)
+            else:
+                self._pages.move_to_end(page_no)
+            return page[offset] if offset < len(page) else None
+
+        def render_line(self, y: int) -> Strip:
+            row = round(self.scroll_offset.y) + y
+            width = self.size.width
+            entry = self.entry(row) if row < self.count else None
+            if entry is None:
+                return Strip.blank(width)
+            when = time.strftime("%Y-%m-%d %H:%M", time.localtime(entry.timestamp))
+            text = f"{when}  {entry.model[:16]:<16}  {entry.first_prompt or entry.name}"
+            style = Style(reverse=True) if row == self.cursor else Style()
+            return Strip([Segment(text, style)]).crop_extend(0, width, style)
+
+        def move(self, delta: int) -> None:
+            if not self.count:
+                return
+            self.cursor = max(0, min(self.count - 1, self.cursor + delta))
+            top = round(self.scroll_offset.y)
+            height = self.size.height or 1
+            if self.cursor < top:
+                self.scroll_to(y=self.cursor, animate=False)
+            elif self.cursor >= top + height:
+                self.scroll_to(y=self.cursor - height + 1, animate=False)
+            self.refresh()
+
+        # ScrollView binds the navigation keys to these; move the cursor instead
+        def action_scroll_up(self) -> None:
+            self.move(-1)
+
+        def action_scroll_down(self) -> None:
+            self.move(1)
+
+        def action_page_up(self) -> None:
+            self.move(-max(1, self.size.height))
+
+        def action_page_down(self) -> None:
+            self.move(max(1, self.size.height))
+
+        def action_scroll_home(self) -> None:
+            self.move(-self.count)
+
+        def action_scroll_end(self) -> None:
+            self.move(self.count)
+
+
+    class HistoryApp(App[Path]):
+        """Browse saved rollouts; exits with the path of the selected one."""
+
+        def __init__(self, history_dir: Path, index: HistoryIndex | None = None) -> None:
             super().__init__()
             self.history_dir = history_dir
-            self.selection: str | None = None
+            self.index = index or HistoryIndex(history_dir)
+            self.index.refresh()
+            self.list = HistoryList(self.index)
 
         def compose(self) -> ComposeResult:
-            for p in sorted(self.history_dir.glob("*.json")):
-                yield Static(p.name)
+            yield self.list
 
         def on_key(self, event) -> None:  # type: ignore
             if event.key == "q":
                 self.exit(None)
-            if event.key == "enter":
-                focused = self.focused
-                if isinstance(focused, Static):
-                    self.exit((self.history_dir / focused.renderable).read_text())
+            elif event.key == "enter":
+                entry = self.list.entry(self.list.cursor) if self.list.count else None
+                self.exit(self.history_dir / entry.name if entry else None)
 
 
     class ReviewApp(App[str]):
@@ -52,6 +139,48 @@ if TEXTUAL_AVAILABLE:
                 self.exit("yes")
             if event.key.lower() == "n":
                 self.exit("no")
+
+
+    class BatchReviewApp(App[List[int]]):
+        """One review screen for every command of a plan that needs approval.
+
+        Exits with the indices (into *commands*) the user approved.  Every
+        group starts unapproved, so nothing runs unless it is picked.
+        """
+
+        def __init__(self, commands: List[List[str]], groups: Dict[str, List[int]]) -> None:
+            super().__init__()
+            self.commands = commands
+            self.groups = list(groups.items())
+            self.approved = [False] * len(self.groups)
+            self.labels: List[Static] = []
+
+        def _label(self, n: int) -> str:
+            group, indices = self.groups[n]
+            mark = "x" if self.approved[n] else " "
+            return f"[{mark}] {n + 1}. {group} ({len(indices)})"
+
+        def compose(self) -> ComposeResult:
+            for n, (_, indices) in enumerate(self.groups):
+                label = Static(self._label(n), markup=False)
+                self.labels.append(label)
+                yield label
+                for i in indices:
+                    yield Static("      " + " ".join(self.commands[i]), markup=False)
+            yield Static("[y]es to all / [n]o to all / [1-9] toggle group / [enter] confirm", markup=False)
+
+        def on_key(self, event) -> None:  # type: ignore
+            key = event.key.lower()
+            if key == "y":
+                self.exit([i for _, indices in self.groups for i in indices])
+            elif key == "n":
+                self.exit([])
+            elif key.isdigit() and 0 < int(key) <= len(self.groups):
+                n = int(key) - 1
+                self.approved[n] = not self.approved[n]
+                self.labels[n].update(self._label(n))
+            elif key == "enter":
+                self.exit([i for ok, (_, indices) in zip(self.approved, self.groups) if ok for i in indices])
 else:
     class HistoryApp:
         def __init__(self, *args, **kwargs) -> None:
@@ -60,3 +189,7 @@ else:
     class ReviewApp:
         def __init__(self, *args, **kwargs) -> None:
             raise RuntimeError("textual package required")
+
+    class BatchReviewApp:
+        def __init__(self, *args, **kwargs) -> None:
+            raise RuntimeError("textual package required")